@@ -0,0 +1,143 @@
+"""
+Load test: requests/sec and latency percentiles for server.py
+Usage: python benchmarks/load_test.py [--clients 16] [--requests 3000] [--workers 16] [--prod]
+       python benchmarks/load_test.py --url http://localhost:8000   (test a running server)
+
+By default it starts server.py twice on spare ports, once with --legacy
+(single-threaded, HTTP/1.0) and once in the default threaded keep-alive
+mode, and replays the assets a game launcher page load fetches against
+each. Every client thread reuses one connection whenever the server
+allows it, like a browser does.
+"""
+
+import argparse
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from http.client import HTTPConnection
+from pathlib import Path
+from urllib.parse import urlparse
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def launcher_paths():
+    """The files a game launcher page load pulls in"""
+    paths = ['/game-launcher/', '/game-launcher/game-launcher.js', '/styles.css', '/script.js']
+    for game in sorted((ROOT / 'game-launcher' / 'games').iterdir()):
+        for name in ('data.json', 'game.js', 'styles.css', 'image.png'):
+            if (game / name).exists():
+                paths.append(f'/game-launcher/games/{game.name}/{name}')
+    return paths
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port, extra_args):
+    process = subprocess.Popen(
+        [sys.executable, str(ROOT / 'server.py'), '--port', str(port), '--no-browser', *extra_args],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for _ in range(100):
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.1).close()
+            return process
+        except OSError:
+            time.sleep(0.05)
+    process.kill()
+    sys.exit(f'server.py {" ".join(extra_args)} did not start')
+
+
+def run_load(host, port, paths, clients, total):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    per_client = total // clients
+
+    def client(offset):
+        conn = HTTPConnection(host, port, timeout=10)
+        mine = []
+        for i in range(per_client):
+            path = paths[(offset + i) % len(paths)]
+            start = time.perf_counter()
+            try:
+                conn.request('GET', path)
+                response = conn.getresponse()
+                response.read()
+                if response.status >= 400:
+                    raise OSError(response.status)
+            except (OSError, ValueError):
+                conn.close()
+                with lock:
+                    errors[0] += 1
+                continue
+            mine.append(time.perf_counter() - start)
+        conn.close()
+        with lock:
+            latencies.extend(mine)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'rps': len(latencies) / elapsed,
+        'p50': statistics.median(latencies) * 1000 if latencies else 0,
+        'p99': latencies[max(0, int(len(latencies) * 0.99) - 1)] * 1000 if latencies else 0,
+    }
+
+
+def report(name, stats):
+    print(f"{name:<22} {stats['rps']:8.0f} req/s   p50 {stats['p50']:7.2f} ms   "
+          f"p99 {stats['p99']:7.2f} ms   {stats['requests']} ok / {stats['errors']} errors")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=16, help='concurrent client connections')
+    parser.add_argument('--requests', type=int, default=3000, help='total requests per run')
+    parser.add_argument('--workers', type=int, default=16, help='worker threads for the threaded server')
+    parser.add_argument('--prod', action='store_true', help='run the threaded server with --prod caching')
+    parser.add_argument('--url', help='test this running server instead of starting server.py')
+    args = parser.parse_args()
+
+    paths = launcher_paths()
+    print(f"{args.requests} requests over {args.clients} connections, {len(paths)} launcher assets\n")
+
+    if args.url:
+        url = urlparse(args.url)
+        report(args.url, run_load(url.hostname, url.port or 80, paths, args.clients, args.requests))
+        return
+
+    results = {}
+    for name, extra in (('legacy (HTTP/1.0)', ['--legacy']),
+                        (f'threaded ({args.workers} workers)',
+                         ['--workers', str(args.workers)] + (['--prod'] if args.prod else []))):
+        port = free_port()
+        process = start_server(port, extra)
+        try:
+            results[name] = run_load('127.0.0.1', port, paths, args.clients, args.requests)
+        finally:
+            process.terminate()
+            process.wait()
+        report(name, results[name])
+
+    legacy, threaded = results.values()
+    print(f"\nThroughput: {threaded['rps'] / legacy['rps']:.1f}x   p99: {legacy['p99']:.2f} -> {threaded['p99']:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
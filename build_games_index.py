@@ -0,0 +1,28 @@
+"""
+Build step: write game-launcher/games.json, the static twin of server.py's /api/games
+Usage: python build_games_index.py
+
+GitHub Pages has no /api/games, so the launcher falls back to this file and
+still loads the whole catalogue in one request. Re-run it (and commit the
+result) after adding a game or editing a data.json.
+"""
+
+import json
+import sys
+
+from server import GAMES_DIR, scan_games
+
+OUTPUT = GAMES_DIR.parent / 'games.json'
+
+
+def main():
+    games = scan_games()
+    with open(OUTPUT, 'w', encoding='utf-8') as f:
+        json.dump(games, f, indent=2)
+        f.write('\n')
+    print(f"✓ Wrote {len(games)} games to {OUTPUT.relative_to(GAMES_DIR.parent.parent)}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
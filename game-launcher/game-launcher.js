@@ -6,10 +6,25 @@
     const gamesGrid = document.getElementById('games-grid');
     const noResults = document.getElementById('no-results');
     const loading = document.getElementById('loading');
+    const pager = document.getElementById('games-pager');
+    const pagePrev = document.getElementById('pagePrev');
+    const pageNext = document.getElementById('pageNext');
+    const pageInfo = document.getElementById('pageInfo');
 
     let games = [];
     const selectedCategories = new Set();
 
+    // With the local server, /api/games filters, sorts and pages the catalogue;
+    // the static games.json (GitHub Pages) is filtered here instead
+    const GAMES_PAGE_SIZE = 200;
+    // Typing waits this long for a pause before asking the server
+    const SEARCH_DEBOUNCE_MS = 250;
+    let serverFiltering = false;
+    let filterRequest = null;
+    let searchTimer = null;
+    let currentPage = 1;
+    let pageCount = 1;
+
     function normalizeCat(c) {
         return ('' + c).toLowerCase().trim();
     }
@@ -19,9 +34,13 @@
         return s.charAt(0).toUpperCase() + s.slice(1);
     }
 
-    function renderCategories() {
+    function renderCategories(categoryNames) {
         const allCats = new Set();
-        games.forEach(g => (g.categories || []).forEach(c => allCats.add(normalizeCat(c))));
+        if (categoryNames) {
+            categoryNames.forEach(c => allCats.add(normalizeCat(c)));
+        } else {
+            games.forEach(g => (g.categories || []).forEach(c => allCats.add(normalizeCat(c))));
+        }
         categoryList.innerHTML = '';
         Array.from(allCats).sort().forEach(cat => {
             const li = document.createElement('li');
@@ -171,23 +190,101 @@
         });
     }
 
+    // Same rule as the server's /api/games search: lower-cased words
+    function searchTokens(text) {
+        return ('' + text).toLowerCase().match(/[\p{L}\p{N}_]+/gu) || [];
+    }
+
+    // Every query word must start a word of the game's id, name, description, developer or categories
+    function matchesQueryWords(g, words) {
+        const text = ['id', 'name', 'description', 'developer'].map(f => g[f] || '').join(' ');
+        const tokens = searchTokens(text + ' ' + (g.categories || []).join(' '));
+        return words.every(w => tokens.some(t => t.startsWith(w)));
+    }
+
     function matchesGame(g, query) {
-        const name = (g.name || '').toLowerCase();
         const cats = (g.categories || []).map(c => normalizeCat(c));
-        const q = (query || '').toLowerCase();
-        const matchesQuery = !q || name.includes(q);
+        const matchesQuery = matchesQueryWords(g, searchTokens(query || ''));
         // Check that ALL selectedCategories are present in cats
         const matchesCategories = Array.from(selectedCategories).every(sel => cats.includes(sel));
         return matchesQuery && matchesCategories;
     }
 
     function filter() {
+        clearTimeout(searchTimer);
+        if (serverFiltering) {
+            // A new search or category set starts again from the first page
+            filterOnServer(1);
+            return;
+        }
         const q = (searchInput && searchInput.value) ? searchInput.value.trim() : '';
         const filtered = games.filter(g => matchesGame(g, q));
         renderGames(filtered);
         noResults.classList.toggle('hidden', filtered.length !== 0);
     }
 
+    function normalizeGames(list) {
+        return (list || []).map(g => {
+            g.categories = (g.categories || []).map(c => normalizeCat(c));
+            return g;
+        });
+    }
+
+    // One page of games matching the current search and categories, from /api/games
+    async function fetchGamesPage(signal, page = 1) {
+        const params = new URLSearchParams({ per_page: GAMES_PAGE_SIZE, page });
+        selectedCategories.forEach(cat => params.append('category', cat));
+        const q = (searchInput && searchInput.value) ? searchInput.value.trim() : '';
+        if (q) params.set('q', q);
+
+        const response = await fetch(`/api/games?${params}`, { signal });
+        if (!response.ok) throw new Error(`/api/games returned ${response.status}`);
+        const data = await response.json();
+        if (!data || !Array.isArray(data.games)) throw new Error('Unexpected /api/games response');
+        return data;
+    }
+
+    async function filterOnServer(page) {
+        // Only the latest search/category/page change matters; drop the one still in flight
+        if (filterRequest) filterRequest.abort();
+        const controller = filterRequest = new AbortController();
+        try {
+            const data = await fetchGamesPage(controller.signal, page);
+            if (controller !== filterRequest) return;
+            showServerPage(data);
+        } catch (e) {
+            if (e.name !== 'AbortError') console.warn('Filtering games failed:', e);
+        }
+    }
+
+    // Render one /api/games page and update the page controls
+    function showServerPage(data) {
+        const filtered = normalizeGames(data.games);
+        renderGames(filtered);
+        noResults.classList.toggle('hidden', filtered.length !== 0);
+        currentPage = data.page || 1;
+        pageCount = data.pages || 1;
+        updatePager();
+    }
+
+    function updatePager() {
+        if (!pager) return;
+        pager.classList.toggle('hidden', !serverFiltering || pageCount <= 1);
+        pagePrev.disabled = currentPage <= 1;
+        pageNext.disabled = currentPage >= pageCount;
+        pageInfo.textContent = `Page ${currentPage} of ${pageCount}`;
+    }
+
+    function wirePager() {
+        if (!pager) return;
+        pagePrev.addEventListener('click', () => {
+            if (currentPage > 1) filterOnServer(currentPage - 1);
+        });
+        pageNext.addEventListener('click', () => {
+            if (currentPage < pageCount) filterOnServer(currentPage + 1);
+        });
+    }
+
     function wireCategoryClicks() {
         if (!categoryList) return;
         categoryList.addEventListener('click', function(e) {
@@ -225,16 +322,29 @@
     async function loadGames() {
         loading.classList.remove('hidden');
         
-        // Try API first (for local server), fallback to scanning games folder (for GitHub Pages)
+        // Local server: the API answers every search and category change
         try {
-            const apiResponse = await fetch('/api/games');
-            if (apiResponse.ok) {
-                const data = await apiResponse.json();
-                processGamesData(data);
-                return;
+            const data = await fetchGamesPage();
+            serverFiltering = true;
+            // The first page is already in hand; the API is only asked again when a filter or page changes
+            processGamesData(data.games, Object.keys(data.categories || {}), data);
+            return;
+        } catch (e) {
+            console.log('/api/games not available, loading games.json...');
+        }
+
+        // GitHub Pages: the whole catalogue in one request, from build_games_index.py
+        try {
+            const indexResponse = await fetch('games.json');
+            if (indexResponse.ok) {
+                const data = await indexResponse.json();
+                if (Array.isArray(data)) {
+                    processGamesData(data);
+                    return;
+                }
             }
         } catch (e) {
-            console.log('API not available, scanning games folder...');
+            console.log('games.json not available, scanning games folder...');
         }
         
         // Fallback: scan games folder and load data.json from each game
@@ -277,16 +387,18 @@
         processGamesData(gamesData);
     }
     
-    function processGamesData(data) {
+    function processGamesData(data, categoryNames, firstPage) {
         console.debug('Loaded', (data || []).length, 'games', data);
-                games = (data || []).map(g => {
-                    g.categories = (g.categories || []).map(c => normalizeCat(c));
-                    return g;
-                });
-                renderCategories();
+                games = normalizeGames(data);
+                renderCategories(categoryNames);
                 wireCategoryClicks();
+                wirePager();
                 updateSelectedUI();
-                filter();
+                if (firstPage) {
+                    showServerPage(firstPage);
+                } else {
+                    filter();
+                }
 
                 // If no games were returned, show a helpful message
                 if (!data || data.length === 0) {
@@ -323,8 +435,15 @@
                 });
     }
 
+    // The static list filters as you type; the server is only asked once typing pauses
+    function onSearchInput() {
+        clearTimeout(searchTimer);
+        if (serverFiltering) searchTimer = setTimeout(filter, SEARCH_DEBOUNCE_MS);
+        else filter();
+    }
+
     if (searchInput) {
-        searchInput.addEventListener('input', filter);
+        searchInput.addEventListener('input', onSearchInput);
     }
 
     // helper to open info panel
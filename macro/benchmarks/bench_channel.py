@@ -0,0 +1,78 @@
+"""
+Benchmark: per-command overhead of POST /execute vs the pipelined channel
+Usage: python benchmarks/bench_channel.py [--commands 2000] [--url http://localhost:9001]
+
+Needs a running agent. Both paths run the same cheap operator block, so the
+numbers are transport overhead: one HTTP round-trip per block for /execute,
+versus one batched POST to /channel/<id>/commands with the results read
+back off the channel's event stream.
+"""
+
+import argparse
+import json
+import sys
+import time
+from http.client import HTTPConnection
+from urllib.parse import urlparse
+
+
+def request(conn, method, path, body=None, headers=None):
+    conn.request(method, path, body=body, headers=headers or {})
+    response = conn.getresponse()
+    return json.loads(response.read())
+
+
+def bench_execute(host, port, command, count):
+    conn = HTTPConnection(host, port)
+    body = json.dumps(command)
+    start = time.perf_counter()
+    for _ in range(count):
+        request(conn, 'POST', '/execute', body, {'Content-Type': 'application/json'})
+    return time.perf_counter() - start
+
+
+def bench_channel(host, port, command, count):
+    conn = HTTPConnection(host, port)
+    channel = request(conn, 'POST', '/channel')['channel']
+    events = HTTPConnection(host, port)
+    events.request('GET', f'/channel/{channel}/events')
+    stream = events.getresponse()
+
+    batch = json.dumps([{**command, 'seq': i} for i in range(count)])
+    start = time.perf_counter()
+    request(conn, 'POST', f'/channel/{channel}/commands', batch, {'Content-Type': 'text/plain'})
+    received = 0
+    while received < count:
+        line = stream.fp.readline()
+        if not line:
+            sys.exit('Event stream closed early')
+        if line.startswith(b'data:') and b'"seq"' in line:
+            received += 1
+    elapsed = time.perf_counter() - start
+
+    request(conn, 'DELETE', f'/channel/{channel}')
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--commands', type=int, default=2000)
+    parser.add_argument('--url', default='http://localhost:9001')
+    args = parser.parse_args()
+
+    url = urlparse(args.url)
+    command = {'type': 'join', 'params': {'text1': 'a', 'text2': 'b'}}
+    print(f"{args.commands} '{command['type']}' commands against {args.url}\n")
+
+    execute = bench_execute(url.hostname, url.port, command, args.commands)
+    channel = bench_channel(url.hostname, url.port, command, args.commands)
+
+    per_execute = execute / args.commands * 1e6
+    per_channel = channel / args.commands * 1e6
+    print(f"POST /execute per block       {per_execute:8.1f} us/command")
+    print(f"Pipelined channel             {per_channel:8.1f} us/command")
+    print(f"\nSpeed-up: {per_execute / per_channel:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
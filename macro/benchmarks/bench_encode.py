@@ -0,0 +1,97 @@
+"""
+Micro-benchmark: per-frame latency of the display encode pipelines
+Usage: python benchmarks/bench_encode.py [--frames 50] [--width 1920 --height 1080] [--live]
+
+Compares the original PIL path (mss BGRA -> screenshot.rgb -> Image.frombytes
+-> thumbnail(LANCZOS) -> JPEG) with the NumPy/OpenCV path used by the agent
+(zero-copy BGRA view -> cv2.resize(INTER_AREA) -> cv2.imencode).
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import mss
+import mss.screenshot
+import numpy as np
+from PIL import Image
+
+from display import StreamSettings, encode_frame_pil, encode_frame_opencv
+
+
+def synthetic_screenshot(width, height):
+    """Raw BGRA bytes for a desktop-like frame: gradients plus noisy 'text' blocks"""
+    rng = np.random.default_rng(0)
+    frame = np.zeros((height, width, 4), dtype=np.uint8)
+    frame[..., 0] = np.linspace(0, 255, width, dtype=np.uint8)[None, :]
+    frame[..., 1] = np.linspace(0, 255, height, dtype=np.uint8)[:, None]
+    frame[..., 2] = 96
+    for _ in range(40):
+        x, y = rng.integers(0, width - 200), rng.integers(0, height - 40)
+        frame[y:y + 40, x:x + 200, :3] = rng.integers(0, 255, (40, 200, 3), dtype=np.uint8)
+    frame[..., 3] = 255
+    return bytearray(frame.tobytes())
+
+
+def legacy_pipeline(screenshot, settings):
+    img = Image.frombytes('RGB', screenshot.size, screenshot.rgb)
+    return encode_frame_pil(img, settings)
+
+
+def fast_pipeline(screenshot, settings):
+    width, height = screenshot.size
+    frame = np.frombuffer(screenshot.raw, dtype=np.uint8).reshape(height, width, 4)
+    return encode_frame_opencv(frame, settings)
+
+
+def measure(name, pipeline, screenshots, settings):
+    # Fresh ScreenShot objects each frame so mss's cached .rgb isn't reused
+    pipeline(screenshots[0](), settings)
+    timings = []
+    size = 0
+    for make in screenshots:
+        shot = make()
+        start = time.perf_counter()
+        size = len(pipeline(shot, settings))
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{name:<10} mean {statistics.mean(timings):7.2f} ms   "
+          f"median {statistics.median(timings):7.2f} ms   p95 {p95:7.2f} ms   "
+          f"{1000 / statistics.mean(timings):6.1f} fps   {size / 1024:.1f} KB/frame")
+    return statistics.mean(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--frames', type=int, default=50)
+    parser.add_argument('--width', type=int, default=1920)
+    parser.add_argument('--height', type=int, default=1080)
+    parser.add_argument('--live', action='store_true', help='grab the primary monitor instead of a synthetic frame')
+    args = parser.parse_args()
+
+    if args.live:
+        sct = mss.mss()
+        monitor = sct.monitors[1]
+        make = lambda: sct.grab(monitor)
+        print(f"Live capture: {monitor['width']}x{monitor['height']}")
+    else:
+        data = synthetic_screenshot(args.width, args.height)
+        monitor = {'left': 0, 'top': 0, 'width': args.width, 'height': args.height}
+        make = lambda: mss.screenshot.ScreenShot(data, monitor)
+        print(f"Synthetic frame: {args.width}x{args.height}")
+
+    screenshots = [make] * args.frames
+    print(f"{args.frames} frames -> max 640x480, JPEG quality 85\n")
+
+    legacy = measure('PIL', legacy_pipeline, screenshots, StreamSettings(resample='lanczos', encoder='pil'))
+    fast = measure('OpenCV', fast_pipeline, screenshots, StreamSettings(resample='area', encoder='opencv'))
+    print(f"\nSpeed-up: {legacy / fast:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
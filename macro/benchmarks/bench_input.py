@@ -0,0 +1,48 @@
+"""
+Benchmark: mouse actions per second through the safe and fast input backends
+Usage: python benchmarks/bench_input.py [--actions 30] [--clicks]
+
+Moves the real mouse pointer back and forth by one pixel around where it
+is now (and right-clicks too with --clicks, so point it somewhere
+harmless). The safe backend pays pyautogui's PAUSE after every call, so
+expect it to take about --actions / 10 seconds.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from inputs import MODES, get_backend
+
+
+def measure(mode, actions, clicks):
+    backend = get_backend(mode)
+    x, y = backend.position()
+    start = time.perf_counter()
+    for i in range(actions):
+        if clicks and i % 2:
+            backend.click('right')
+        else:
+            backend.move(x + (i % 2), y)
+    elapsed = time.perf_counter() - start
+    backend.move(x, y)
+    print(f"{mode:<6} {actions / elapsed:10.1f} actions/s   {elapsed / actions * 1000:8.2f} ms/action")
+    return actions / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--actions', type=int, default=30)
+    parser.add_argument('--clicks', action='store_true', help='alternate moves with right clicks')
+    args = parser.parse_args()
+
+    print(f"{args.actions} {'move/click' if args.clicks else 'move'} actions per backend\n")
+    rates = {mode: measure(mode, args.actions, args.clicks) for mode in MODES}
+    print(f"\nSpeed-up: {rates['fast'] / rates['safe']:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Benchmark: pixel/colour probes per second, one grab per probe vs the shared frame cache
+Usage: python benchmarks/bench_probes.py [--loops 200] [--probes 24] [--live]
+
+Each loop runs --probes probes (half pixel checks, half region colour
+checks), like one pass of a `while` loop full of probe blocks. "Grab per
+probe" captures the screen for every probe, the way a block doing its own
+capture would. "Frame cache" reads every probe from screen.frames, which
+grabs at most once per max_age. Without --live, a copy of a synthetic
+1920x1080 frame stands in for the capture, which understates real grab cost.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from display import capture_session
+from screen import PRIMARY_SCREEN, FrameCache, colour_fraction
+
+
+def synthetic_grab(width, height):
+    frame = np.random.default_rng(0).integers(0, 255, (height, width, 4), dtype=np.uint8)
+
+    def grab(source):
+        return frame.copy(), (0, 0)
+    return grab
+
+
+def probe_points(count, width, height):
+    rng = np.random.default_rng(1)
+    xs = rng.integers(0, width - 50, count)
+    ys = rng.integers(0, height - 50, count)
+    return [(int(x), int(y)) for x, y in zip(xs, ys)]
+
+
+def run_probes(cache, points):
+    for i, (x, y) in enumerate(points):
+        if i % 2:
+            cache.pixel(x, y)
+        else:
+            colour_fraction(cache.region(f'{PRIMARY_SCREEN}@{x},{y},50,50'), (0, 0, 255), 10)
+
+
+def measure(name, cache, points, loops):
+    start = time.perf_counter()
+    for _ in range(loops):
+        run_probes(cache, points)
+    elapsed = time.perf_counter() - start
+    probes = loops * len(points)
+    print(f"{name:<16} {probes / elapsed:10.0f} probes/s   "
+          f"{elapsed / loops * 1000:7.2f} ms/loop   {cache.grabs} grabs")
+    return probes / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--loops', type=int, default=200)
+    parser.add_argument('--probes', type=int, default=24, help='probes per loop')
+    parser.add_argument('--max-age', type=float, default=0.03, help='frame cache lifetime in seconds')
+    parser.add_argument('--live', action='store_true', help='grab the primary monitor instead of a synthetic frame')
+    args = parser.parse_args()
+
+    if args.live:
+        grab = capture_session.grab_at
+        frame, _ = grab(PRIMARY_SCREEN)
+        if frame is None:
+            sys.exit('Could not capture the primary screen')
+        height, width = frame.shape[:2]
+        print(f"Live capture: {width}x{height}")
+    else:
+        width, height = 1920, 1080
+        grab = synthetic_grab(width, height)
+        print(f"Synthetic frame: {width}x{height}")
+    print(f"{args.loops} loops x {args.probes} probes\n")
+
+    points = probe_points(args.probes, width, height)
+    per_probe = measure('Grab per probe', FrameCache(grab, max_age=0), points, args.loops)
+    cached = measure('Frame cache', FrameCache(grab, max_age=args.max_age), points, args.loops)
+    print(f"\nSpeed-up: {cached / per_probe:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
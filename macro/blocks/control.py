@@ -1,4 +1,4 @@
-import time
+from scheduler import scheduler
 
 
 def start(params):
@@ -7,7 +7,7 @@ def start(params):
 
 def wait(params):
     duration = float(params.get('duration', 1))
-    time.sleep(duration)
+    scheduler.sleep(duration, 'wait')
     return f"Waited {duration}s"
 
 
@@ -1,14 +1,17 @@
 """Keyboard category block handlers"""
 
-import time
+import threading
 import keyboard
-import pyautogui
+
+from cancel import wait_for
+from inputs import get_backend
+from scheduler import scheduler
 
 
 def press_key(params):
     """Press and release a single key"""
     key = params.get('key', '')
-    keyboard.press_and_release(key)
+    get_backend().tap(key)
     return f"Pressed key: {key}"
 
 
@@ -16,16 +19,33 @@ def press_key_for(params):
     """Hold a key for a specified duration"""
     key = params.get('key', '')
     duration = float(params.get('time', 1))
-    keyboard.press(key)
-    time.sleep(duration)
-    keyboard.release(key)
+    backend = get_backend()
+    backend.key_down(key)
+    try:
+        scheduler.sleep(duration, 'press_key_for')
+    finally:
+        backend.key_up(key)
     return f"Held key {key} for {duration}s"
 
 
+def key_down(params):
+    """Press a key without releasing it"""
+    key = params.get('key', '')
+    get_backend().key_down(key)
+    return f"Pressed key down: {key}"
+
+
+def key_up(params):
+    """Release a held key"""
+    key = params.get('key', '')
+    get_backend().key_up(key)
+    return f"Released key: {key}"
+
+
 def type_string(params):
     """Type a string of text"""
     text = params.get('text', '')
-    keyboard.write(text)
+    get_backend().write(text)
     return f"Typed: {text}"
 
 
@@ -33,7 +53,7 @@ def press_key_with_modifier(params):
     """Press a key with a modifier (ctrl, shift, alt, etc.)"""
     key = params.get('key', '')
     modifier = params.get('modifier', 'ctrl')
-    keyboard.press_and_release(f'{modifier}+{key}')
+    get_backend().tap(f'{modifier}+{key}')
     return f"Pressed {modifier}+{key}"
 
 
@@ -42,23 +62,39 @@ def hold_key_with_modifier(params):
     key = params.get('key', '')
     modifier = params.get('modifier', 'ctrl')
     duration = float(params.get('duration', 1))
-    keyboard.press(modifier)
-    keyboard.press(key)
-    time.sleep(duration)
-    keyboard.release(key)
-    keyboard.release(modifier)
+    backend = get_backend()
+    backend.key_down(modifier)
+    try:
+        backend.key_down(key)
+        try:
+            scheduler.sleep(duration, 'hold_key_with_modifier')
+        finally:
+            backend.key_up(key)
+    finally:
+        backend.key_up(modifier)
     return f"Held {modifier}+{key} for {duration}s"
 
 
 def wait_for_key(params):
     """Wait for a specific key to be pressed"""
     key = params.get('key', '')
-    keyboard.wait(key)
+    # keyboard.wait() can't be interrupted, so wait on a hotkey-driven event instead
+    pressed = threading.Event()
+    hotkey = keyboard.add_hotkey(key, pressed.set)
+    try:
+        wait_for(pressed)
+    finally:
+        keyboard.remove_hotkey(hotkey)
     return f"Waited for key: {key}"
 
 
 def wait_any_key(params):
     """Wait for any key to be pressed"""
-    keyboard.wait()
+    pressed = threading.Event()
+    hook = keyboard.on_press(lambda event: pressed.set())
+    try:
+        wait_for(pressed)
+    finally:
+        keyboard.unhook(hook)
     return "Waited for any key"
 
@@ -1,14 +1,17 @@
 """Mouse category block handlers"""
 
-import time
-import pyautogui
+from inputs import get_backend
+from scheduler import scheduler
+
+# Glide positions per second; each step lands on a fixed deadline
+GLIDE_RATE = 120
 
 
 def move(params):
     """Move mouse to specific coordinates"""
     x = int(params.get('X') or params.get('x', 0))
     y = int(params.get('Y') or params.get('y', 0))
-    pyautogui.moveTo(x, y)
+    get_backend().move(x, y)
     return f"Moved mouse to ({x}, {y})"
 
 
@@ -17,7 +20,11 @@ def glide(params):
     x = int(params.get('X') or params.get('x', 0))
     y = int(params.get('Y') or params.get('y', 0))
     duration = float(params.get('TIME') or params.get('time', 1))
-    pyautogui.moveTo(x, y, duration=duration)
+    backend = get_backend()
+    start_x, start_y = backend.position()
+    for fraction in scheduler.ticks(duration, GLIDE_RATE, 'glide'):
+        backend.move_step(round(start_x + (x - start_x) * fraction),
+                          round(start_y + (y - start_y) * fraction))
     return f"Glided to ({x}, {y}) in {duration}s"
 
 
@@ -26,20 +33,43 @@ def scroll_mouse(params):
     direction = params.get('direction', 'up')
     amount = int(params.get('amount', 1))
     scroll_amount = amount if direction == 'up' else -amount
-    pyautogui.scroll(scroll_amount)
+    get_backend().scroll(scroll_amount)
     return f"Scrolled {direction} by {amount}"
 
 
 def press_mouse(params):
     """Click a mouse button"""
     button = params.get('button', 'left')
-    pyautogui.click(button=button)
+    get_backend().click(button)
     return f"Clicked {button} button"
 
 
 def double_press_mouse(params):
     """Double-click a mouse button"""
     button = params.get('button', 'left')
-    pyautogui.doubleClick(button=button)
+    get_backend().click(button, clicks=2)
     return f"Double-clicked {button} button"
 
+
+def mouse_down(params):
+    """Press a mouse button without releasing it"""
+    button = params.get('button', 'left')
+    get_backend().mouse_down(button)
+    return f"Pressed {button} button down"
+
+
+def mouse_up(params):
+    """Release a held mouse button"""
+    button = params.get('button', 'left')
+    get_backend().mouse_up(button)
+    return f"Released {button} button"
+
+
+def mouse_x(params):
+    """Current mouse x position"""
+    return get_backend().position()[0]
+
+
+def mouse_y(params):
+    """Current mouse y position"""
+    return get_backend().position()[1]
@@ -0,0 +1,115 @@
+"""Vision category block handlers"""
+
+import time
+
+import cv2
+
+from cancel import interruptible_sleep
+from inputs import get_backend
+from matching import find_template, templates, to_gray
+from display import capture_session
+from screen import colour_fraction, format_colour, frames, parse_colour, region_source
+
+# Delay between searches while waiting; a search itself takes a few ms with a region
+POLL_INTERVAL = 0.01
+
+
+def locate(params):
+    """Search params['region'] for params['image'], returning a Match or None.
+
+    The match is in screen coordinates, ready for the mouse blocks, except
+    on camera sources, which have no screen position and keep frame ones.
+    """
+    template = templates.get(params.get('image', ''))
+    source = region_source(params.get('region'))
+    confidence = float(params.get('confidence', 0.8))
+    frame, origin = capture_session.grab_at(source)
+    if frame is None:
+        return None
+    match = find_template(to_gray(frame), template, confidence)
+    if match is None or origin is None:
+        return match
+    return match._replace(x=match.x + origin[0], y=match.y + origin[1])
+
+
+def image_on_screen(params):
+    """Whether the image is visible on screen"""
+    return locate(params) is not None
+
+
+def image_position(params):
+    """x or y of the centre of the image on screen, -1 when it isn't found"""
+    match = locate(params)
+    if match is None:
+        return -1
+    x, y = match.center
+    return y if params.get('axis', 'x') == 'y' else x
+
+
+def wait_for_image(params):
+    """Wait until the image appears on (or disappears from) the screen"""
+    image = params.get('image', '')
+    appear = params.get('state', 'appears') != 'disappears'
+    timeout = float(params.get('timeout', 10))
+    deadline = time.monotonic() + timeout if timeout > 0 else None
+
+    while True:
+        match = locate(params)
+        if (match is not None) == appear:
+            break
+        if deadline is not None and time.monotonic() >= deadline:
+            return f"Error: {image} did not {'appear' if appear else 'disappear'} within {timeout}s"
+        interruptible_sleep(POLL_INTERVAL)
+
+    if appear:
+        return f"{image} appeared at {match.center} (confidence {match.score:.2f})"
+    return f"{image} disappeared"
+
+
+def click_image(params):
+    """Click the centre of the image on screen"""
+    image = params.get('image', '')
+    button = params.get('button', 'left')
+    if region_source(params.get('region')).startswith('camera-'):
+        return "Error: camera images have no screen position to click"
+    match = locate(params)
+    if match is None:
+        return f"Error: {image} not found on screen"
+    x, y = match.center
+    get_backend().click(button, x=x, y=y)
+    return f"Clicked {button} button on {image} at ({x}, {y})"
+
+
+def pixel_colour(params):
+    """Colour of one screen pixel as #rrggbb"""
+    x = int(params.get('X') or params.get('x', 0))
+    y = int(params.get('Y') or params.get('y', 0))
+    return format_colour(frames.pixel(x, y))
+
+
+def pixel_is_colour(params):
+    """Whether a screen pixel is within tolerance of a colour"""
+    x = int(params.get('X') or params.get('x', 0))
+    y = int(params.get('Y') or params.get('y', 0))
+    target = parse_colour(params.get('colour', '#ffffff'))
+    tolerance = int(params.get('tolerance', 10))
+    return all(abs(a - b) <= tolerance for a, b in zip(frames.pixel(x, y), target))
+
+
+def region_colour_percent(params):
+    """Percentage of a region within tolerance of a colour"""
+    view = frames.region(region_source(params.get('region')))
+    target = parse_colour(params.get('colour', '#ffffff'))
+    return round(colour_fraction(view, target, params.get('tolerance', 10)) * 100, 1)
+
+
+def region_is_colour(params):
+    """Whether at least percent % of a region is within tolerance of a colour"""
+    percent = float(params.get('percent', 50))
+    return region_colour_percent(params) >= percent
+
+
+def region_average_colour(params):
+    """Mean colour of a region as #rrggbb"""
+    view = frames.region(region_source(params.get('region')))
+    return format_colour(cv2.mean(view)[:3])
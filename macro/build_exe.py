@@ -54,6 +54,8 @@ def main():
         "--hidden-import", "pyautogui",       # Ensure pyautogui is included
         "--hidden-import", "flask",           # Ensure flask is included
         "--hidden-import", "flask_cors",      # Ensure flask-cors is included
+        "--hidden-import", "matching",        # Helpers only imported by block modules
+        "--hidden-import", "screen",
         "--clean",                            # Clean cache
         str(agent_script)
     ]
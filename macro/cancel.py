@@ -0,0 +1,86 @@
+"""Cooperative cancellation for long-running blocks
+
+Whatever is running blocks (a /jobs worker, a /run program) installs a
+CancelToken for its thread with cancel_scope(). Blocks that sleep or wait
+use interruptible_sleep() / wait_for() so cancelling the token wakes them
+immediately with a Cancelled exception. Outside a scope they behave like
+plain time.sleep() / Event.wait().
+"""
+
+import threading
+from contextlib import contextmanager
+
+
+class Cancelled(Exception):
+    """The block's job or program was cancelled"""
+
+
+class CancelToken:
+    """A one-way cancellation flag that sleeping blocks can wait on"""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self):
+        self._event.set()
+
+    def check(self):
+        if self._event.is_set():
+            raise Cancelled()
+
+    def sleep(self, seconds):
+        """Sleep for seconds, raising Cancelled as soon as the token is cancelled"""
+        if seconds > 0 and self._event.wait(seconds):
+            raise Cancelled()
+        self.check()
+
+
+_local = threading.local()
+
+
+def current_token():
+    """The token for the calling thread, or None outside a cancel scope"""
+    return getattr(_local, 'token', None)
+
+
+@contextmanager
+def cancel_scope(token):
+    previous = current_token()
+    _local.token = token
+    try:
+        yield token
+    finally:
+        _local.token = previous
+
+
+def interruptible_sleep(seconds):
+    token = current_token()
+    if token is None:
+        threading.Event().wait(max(0, seconds))
+    else:
+        token.sleep(seconds)
+
+
+def wait_for(event, timeout=None, poll=0.05):
+    """Wait for a threading.Event, waking every poll seconds to check for cancellation.
+
+    Returns True if the event was set, False on timeout.
+    """
+    token = current_token()
+    if token is None:
+        return event.wait(timeout)
+
+    remaining = timeout
+    while True:
+        token.check()
+        step = poll if remaining is None else min(poll, remaining)
+        if event.wait(step):
+            return True
+        if remaining is not None:
+            remaining -= step
+            if remaining <= 0:
+                return False
@@ -0,0 +1,128 @@
+"""Persistent editor <-> agent channels
+
+Instead of one POST /execute per block, the editor opens a channel once
+and then:
+
+    GET  /channel/<id>/events     server-sent events: results, console output, job updates
+    POST /channel/<id>/commands   a JSON list of commands, pipelined onto the channel
+
+Commands run in order on the channel's own worker thread and each one
+answers with a 'result' event carrying its seq number. The command POST
+returns as soon as the commands are queued, so the editor can batch and
+pipeline as many as it likes without waiting on a round-trip per block.
+"""
+
+import json
+import queue
+import secrets
+import threading
+import time
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class Channel:
+    """One editor connection: an ordered command queue and an outgoing event queue"""
+
+    def __init__(self, channel_id, handler):
+        self.id = channel_id
+        self.handler = handler
+        self.events = queue.Queue()
+        self.commands = queue.Queue()
+        self.subscribers = 0
+        self.last_active = time.monotonic()
+        self.closed = False
+        self._worker = threading.Thread(target=self._work, name=f'channel-{channel_id}', daemon=True)
+        self._worker.start()
+
+    def push(self, event, data):
+        if not self.closed:
+            self.events.put((event, data))
+
+    def submit(self, commands):
+        for command in commands:
+            self.commands.put(command)
+        self.last_active = time.monotonic()
+
+    def _work(self):
+        while True:
+            command = self.commands.get()
+            if command is None:
+                return
+            seq = command.get('seq') if isinstance(command, dict) else None
+            try:
+                reply = self.handler(self, command)
+            except Exception as e:
+                reply = {'success': False, 'error': str(e)}
+            self.push('result', {'seq': seq, **reply})
+
+    def stream(self, keepalive=15.0):
+        """SSE body: everything queued so far goes out in one chunk, then waits for more"""
+        self.subscribers += 1
+        try:
+            yield sse_event('open', {'channel': self.id})
+            while not self.closed:
+                try:
+                    first = self.events.get(timeout=keepalive)
+                except queue.Empty:
+                    yield ': keepalive\n\n'
+                    continue
+                if first is None:
+                    break
+                chunk = [sse_event(*first)]
+                while True:
+                    try:
+                        item = self.events.get_nowait()
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        self.closed = True
+                        break
+                    chunk.append(sse_event(*item))
+                yield ''.join(chunk)
+        finally:
+            self.subscribers -= 1
+            self.last_active = time.monotonic()
+
+    def close(self):
+        self.closed = True
+        self.commands.put(None)
+        self.events.put(None)
+
+
+class ChannelHub:
+    """Open channels by id; channels nobody has listened to for idle_timeout are dropped"""
+
+    def __init__(self, handler, idle_timeout=60.0):
+        self.handler = handler
+        self.idle_timeout = idle_timeout
+        self._channels = {}
+        self._lock = threading.Lock()
+
+    def open(self):
+        with self._lock:
+            self._reap()
+            # Unguessable, so another page can't attach to this client's channel
+            channel = Channel(secrets.token_urlsafe(16), self.handler)
+            self._channels[channel.id] = channel
+            return channel
+
+    def get(self, channel_id):
+        with self._lock:
+            return self._channels.get(channel_id)
+
+    def close(self, channel_id):
+        with self._lock:
+            channel = self._channels.pop(channel_id, None)
+        if channel:
+            channel.close()
+        return channel
+
+    def _reap(self):
+        now = time.monotonic()
+        for channel_id, channel in list(self._channels.items()):
+            if channel.subscribers == 0 and now - channel.last_active > self.idle_timeout:
+                del self._channels[channel_id]
+                channel.close()
@@ -0,0 +1,960 @@
+"""Display capture and streaming engine for the macro agent
+
+A CaptureSession keeps capture handles (mss contexts, window DCs, open
+cameras) alive between frames. Frames are NumPy arrays in OpenCV channel
+order (BGR or BGRA), wrapped around the capture buffer without copying.
+One background producer thread per active capture source grabs each frame
+once and encodes it into a small ring buffer per requested stream settings.
+Every /display/stream subscriber reads the latest encoded JPEG from its
+buffer, so extra viewers never trigger extra captures, and viewers sharing
+settings never trigger extra encodes.
+"""
+
+import io
+import logging
+from abc import ABC, abstractmethod
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+
+import mss
+import cv2
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger('macro_agent.display')
+
+
+def parse_source_id(source_id):
+    """Split 'screen-1@x,y,w,h' into ('screen-1', (x, y, w, h)).
+
+    The region of interest is optional and relative to the source's own
+    origin (monitor, window or camera frame). Raises ValueError for a
+    malformed id.
+    """
+    base_id, _, roi_text = str(source_id).partition('@')
+    kind, _, num = base_id.partition('-')
+    if kind not in HANDLE_TYPES or not num.lstrip('-').isdigit():
+        raise ValueError(f'Unknown display source: {source_id}')
+
+    if not roi_text:
+        return base_id, None
+    try:
+        x, y, w, h = (int(v) for v in roi_text.split(','))
+    except ValueError:
+        raise ValueError(f'Region must be x,y,w,h integers: {roi_text}')
+    if x < 0 or y < 0 or w <= 0 or h <= 0:
+        raise ValueError(f'Region must have non-negative origin and positive size: {roi_text}')
+    return base_id, (x, y, w, h)
+
+
+def crop_frame(frame, roi):
+    """Crop a frame array to roi as a view, clipped to the frame bounds"""
+    if roi is None or frame is None:
+        return frame
+    x, y, w, h = roi
+    cropped = frame[y:y + h, x:x + w]
+    return cropped if cropped.size else None
+
+
+class CaptureHandle(ABC):
+    """An open capture device for one source id, opened lazily"""
+
+    def __init__(self, source_id):
+        self.source_id = source_id
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+        self.is_open = False
+        # Desktop (left, top) of the last frame's top-left pixel; None for cameras
+        self.origin = None
+
+    @abstractmethod
+    def open(self):
+        """Acquire the device; raise if it can't be opened"""
+
+    @abstractmethod
+    def grab(self, roi=None):
+        """The next frame as a BGR(A) array cropped to roi, or None"""
+
+    def close(self):
+        self.is_open = False
+
+
+class ScreenHandle(CaptureHandle):
+    """Persistent mss context for one monitor"""
+
+    def __init__(self, source_id):
+        super().__init__(source_id)
+        self.screen_num = int(source_id.split('-')[1])
+        self.sct = None
+        self.monitor = None
+
+    def open(self):
+        self.sct = mss.mss()
+        self.monitor = self.sct.monitors[self.screen_num]
+        self.is_open = True
+
+    def grab(self, roi=None):
+        region = self.monitor
+        if roi is not None:
+            # mss grabs just the rectangle, so cost scales with the region
+            x, y, w, h = roi
+            w = min(w, self.monitor['width'] - x)
+            h = min(h, self.monitor['height'] - y)
+            if w <= 0 or h <= 0:
+                return None
+            region = {'left': self.monitor['left'] + x, 'top': self.monitor['top'] + y,
+                      'width': w, 'height': h}
+        screenshot = self.sct.grab(region)
+        self.origin = (region['left'], region['top'])
+        # View the raw BGRA buffer in place rather than building RGB bytes
+        width, height = screenshot.size
+        return np.frombuffer(screenshot.raw, dtype=np.uint8).reshape(height, width, 4)
+
+    def close(self):
+        if self.sct:
+            self.sct.close()
+            self.sct = None
+        super().close()
+
+
+class WindowHandle(CaptureHandle):
+    """Cached GDI device contexts for one window (Windows only)"""
+
+    def __init__(self, source_id):
+        super().__init__(source_id)
+        self.hwnd = int(source_id.split('-')[1])
+        self.hwndDC = None
+        self.mfcDC = None
+        self.saveDC = None
+        self.bitmap = None
+        self.size = None
+
+    def open(self):
+        if sys.platform != 'win32':
+            raise RuntimeError('Window capture is only supported on Windows')
+        import win32gui
+        import win32ui
+        self.hwndDC = win32gui.GetWindowDC(self.hwnd)
+        self.mfcDC = win32ui.CreateDCFromHandle(self.hwndDC)
+        self.saveDC = self.mfcDC.CreateCompatibleDC()
+        self.is_open = True
+
+    def _ensure_bitmap(self, width, height):
+        # Only rebuild the bitmap when the window is resized
+        import win32gui
+        import win32ui
+        if self.size == (width, height):
+            return
+        if self.bitmap:
+            win32gui.DeleteObject(self.bitmap.GetHandle())
+        self.bitmap = win32ui.CreateBitmap()
+        self.bitmap.CreateCompatibleBitmap(self.mfcDC, width, height)
+        self.saveDC.SelectObject(self.bitmap)
+        self.size = (width, height)
+
+    def grab(self, roi=None):
+        import win32gui
+        from ctypes import windll
+
+        left, top, right, bottom = win32gui.GetWindowRect(self.hwnd)
+        self._ensure_bitmap(right - left, bottom - top)
+
+        result = windll.user32.PrintWindow(self.hwnd, self.saveDC.GetSafeHdc(), 3)
+        if not result:
+            return None
+
+        bmpinfo = self.bitmap.GetInfo()
+        bmpstr = self.bitmap.GetBitmapBits(True)
+        frame = np.frombuffer(bmpstr, dtype=np.uint8).reshape(bmpinfo['bmHeight'], bmpinfo['bmWidth'], 4)
+        self.origin = (left + roi[0], top + roi[1]) if roi else (left, top)
+        # PrintWindow renders the whole window; cropping is a free view
+        return crop_frame(frame, roi)
+
+    def close(self):
+        import win32gui
+        try:
+            if self.bitmap:
+                win32gui.DeleteObject(self.bitmap.GetHandle())
+            if self.saveDC:
+                self.saveDC.DeleteDC()
+            if self.mfcDC:
+                self.mfcDC.DeleteDC()
+            if self.hwndDC:
+                win32gui.ReleaseDC(self.hwnd, self.hwndDC)
+        except Exception as e:
+            logger.warning(f"Error closing window capture {self.source_id}: {e}")
+        self.hwndDC = self.mfcDC = self.saveDC = self.bitmap = self.size = None
+        super().close()
+
+
+class CameraHandle(CaptureHandle):
+    """A cv2.VideoCapture kept open across frames"""
+
+    def __init__(self, source_id):
+        super().__init__(source_id)
+        self.camera_num = int(source_id.split('-')[1])
+        self.cap = None
+
+    def open(self):
+        self.cap = cv2.VideoCapture(self.camera_num)
+        if not self.cap.isOpened():
+            self.cap.release()
+            self.cap = None
+            raise RuntimeError(f'Camera {self.camera_num} could not be opened')
+        # Keep the driver queue short so reads return the newest frame
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self.is_open = True
+
+    def grab(self, roi=None):
+        # OpenCV already hands back BGR, which the encoder takes as-is
+        ret, frame = self.cap.read()
+        return crop_frame(frame, roi) if ret else None
+
+    def close(self):
+        if self.cap:
+            self.cap.release()
+            self.cap = None
+        super().close()
+
+
+HANDLE_TYPES = {
+    'screen': ScreenHandle,
+    'window': WindowHandle,
+    'camera': CameraHandle,
+}
+
+
+class CaptureSession:
+    """Pool of open capture handles keyed by source id.
+
+    Handles open on first use, are reused for every later frame and are
+    closed by a reaper thread once unused for idle_timeout seconds. Source
+    ids with a region ('screen-1@x,y,w,h') share the handle of their base
+    source and only capture that rectangle.
+    """
+
+    def __init__(self, idle_timeout=30.0, retry_delay=2.0):
+        self.idle_timeout = idle_timeout
+        self.retry_delay = retry_delay
+        self._handles = {}
+        self._failed = {}
+        self._lock = threading.Lock()
+        self._reaper = threading.Thread(target=self._reap_loop, name='capture-reaper', daemon=True)
+        self._reaper.start()
+
+    def _get_handle(self, source_id):
+        with self._lock:
+            handle = self._handles.get(source_id)
+            if handle is None:
+                handle = HANDLE_TYPES[source_id.split('-')[0]](source_id)
+                self._handles[source_id] = handle
+            return handle
+
+    def grab(self, source_id):
+        """Capture one frame from source_id, opening its handle if needed"""
+        return self.grab_at(source_id)[0]
+
+    def grab_at(self, source_id):
+        """(frame, (left, top)) for source_id, or (None, None) if nothing was captured.
+
+        (left, top) is where the frame's top-left pixel sits on the desktop,
+        so frame[y, x] is the pixel the mouse reaches at (left + x, top + y).
+        Camera frames have no desktop position and come with origin None.
+        """
+        try:
+            source_id, roi = parse_source_id(source_id)
+        except ValueError as e:
+            logger.warning(f"Error capturing frame: {e}")
+            return None, None
+        handle = self._get_handle(source_id)
+
+        with handle.lock:
+            handle.last_used = time.monotonic()
+            if not handle.is_open:
+                # Don't hammer a device that just failed to open
+                failed_at = self._failed.get(source_id)
+                if failed_at and time.monotonic() - failed_at < self.retry_delay:
+                    return None, None
+                try:
+                    handle.open()
+                    self._failed.pop(source_id, None)
+                except Exception as e:
+                    logger.warning(f"Error opening {source_id}: {e}")
+                    self._failed[source_id] = time.monotonic()
+                    handle.close()
+                    return None, None
+
+            try:
+                frame = handle.grab(roi)
+            except Exception as e:
+                # Drop the handle so the next frame reopens it cleanly
+                logger.warning(f"Error capturing frame from {source_id}: {e}")
+                handle.close()
+                return None, None
+            return (frame, handle.origin) if frame is not None else (None, None)
+
+    def release(self, source_id):
+        """Close and forget the handle for source_id"""
+        source_id = source_id.partition('@')[0]
+        with self._lock:
+            handle = self._handles.pop(source_id, None)
+        if handle:
+            with handle.lock:
+                handle.close()
+
+    def is_open(self, source_id):
+        handle = self._handles.get(source_id.partition('@')[0])
+        return bool(handle and handle.is_open)
+
+    def close_all(self):
+        with self._lock:
+            source_ids = list(self._handles)
+        for source_id in source_ids:
+            self.release(source_id)
+
+    def _reap_loop(self):
+        while True:
+            time.sleep(max(self.idle_timeout / 2, 0.5))
+            now = time.monotonic()
+            with self._lock:
+                idle = [sid for sid, h in self._handles.items()
+                        if now - h.last_used > self.idle_timeout]
+            for source_id in idle:
+                self.release(source_id)
+
+
+# The one session behind the display stream and every block that reads the
+# screen; handles stay open between frames and close after 30s of disuse
+capture_session = CaptureSession(idle_timeout=30.0)
+
+
+def list_screens():
+    """Every monitor mss can see, skipping monitor 0 (all monitors)"""
+    with mss.mss() as sct:
+        return [
+            {
+                'id': f'screen-{i}',
+                'name': f'Screen {i}',
+                'width': monitor['width'],
+                'height': monitor['height']
+            }
+            for i, monitor in enumerate(sct.monitors[1:], 1)
+        ]
+
+
+def list_windows():
+    """Visible, titled top-level windows (Windows only)"""
+    if sys.platform != 'win32':
+        return []
+    import win32gui
+
+    def enum_windows_callback(hwnd, windows):
+        if win32gui.IsWindowVisible(hwnd):
+            title = win32gui.GetWindowText(hwnd)
+            if title:
+                windows.append({
+                    'id': f'window-{hwnd}',
+                    'name': title,
+                    'hwnd': hwnd
+                })
+        return True
+
+    windows_list = []
+    win32gui.EnumWindows(enum_windows_callback, windows_list)
+    return windows_list[:50]  # Limit to 50 windows
+
+
+def probe_camera(index):
+    cap = cv2.VideoCapture(index)
+    try:
+        return cap.isOpened()
+    finally:
+        cap.release()
+
+
+class SourceCatalog:
+    """Cached list of display sources, refreshed in the background.
+
+    Screens, windows and each camera index are probed in parallel, so one
+    slow camera driver no longer holds up the whole list. Readers get the
+    cached result immediately; it is rebuilt every ttl seconds.
+    """
+
+    def __init__(self, capture_session=None, ttl=30.0, camera_indices=range(5)):
+        self.capture_session = capture_session
+        self.ttl = ttl
+        self.camera_indices = list(camera_indices)
+        self._sources = None
+        self._updated_at = None
+        self._refreshing = False
+        self._lock = threading.Lock()
+        self._ready = threading.Condition(self._lock)
+        # One worker per probe; only refresh() submits, and no probe waits on another
+        self._pool = ThreadPoolExecutor(max_workers=2 + len(self.camera_indices),
+                                        thread_name_prefix='source-probe')
+        self._thread = threading.Thread(target=self._refresh_loop, name='source-catalog', daemon=True)
+        self._thread.start()
+
+    def _probe_camera(self, index):
+        # A camera we are streaming from can't be opened twice on some drivers
+        if self.capture_session and self.capture_session.is_open(f'camera-{index}'):
+            return True
+        return probe_camera(index)
+
+    def refresh(self):
+        """Probe every source type in parallel and replace the cache"""
+        with self._lock:
+            if self._refreshing:
+                # Someone else is already probing; wait for their result
+                self._ready.wait_for(lambda: not self._refreshing)
+                return self.snapshot_locked()
+            self._refreshing = True
+
+        sources = None
+        try:
+            jobs = {
+                'screens': self._pool.submit(list_screens),
+                'windows': self._pool.submit(list_windows),
+            }
+            cameras = [(index, self._pool.submit(self._probe_camera, index)) for index in self.camera_indices]
+            previous = self._sources or {}
+            sources = {}
+            for kind, future in jobs.items():
+                try:
+                    sources[kind] = future.result()
+                except Exception as e:
+                    # Keep the last good list rather than blanking the picker
+                    logger.warning(f"Error getting {kind}: {e}")
+                    sources[kind] = previous.get(kind, [])
+
+            known = {camera['id'] for camera in previous.get('cameras', [])}
+            sources['cameras'] = []
+            for index, future in cameras:
+                source_id = f'camera-{index}'
+                try:
+                    found = future.result()
+                except Exception as e:
+                    logger.warning(f"Error probing {source_id}: {e}")
+                    found = source_id in known
+                if found:
+                    sources['cameras'].append({'id': source_id, 'name': f'Camera {index}'})
+        finally:
+            with self._lock:
+                if sources is not None:
+                    self._sources = sources
+                    self._updated_at = time.time()
+                self._refreshing = False
+                self._ready.notify_all()
+
+        with self._lock:
+            return self.snapshot_locked()
+
+    def snapshot_locked(self):
+        return {
+            **(self._sources or {'screens': [], 'windows': [], 'cameras': []}),
+            'updated_at': self._updated_at,
+            'age': round(time.time() - self._updated_at, 3) if self._updated_at else None,
+            'refreshing': self._refreshing,
+        }
+
+    def get(self, refresh=False, timeout=15.0):
+        """Return the cached sources, probing synchronously only when forced
+        or when nothing has been cached yet"""
+        if refresh:
+            return self.refresh()
+        with self._lock:
+            if self._sources is None:
+                self._ready.wait_for(lambda: self._sources is not None, timeout)
+            return self.snapshot_locked()
+
+    def _refresh_loop(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.warning(f"Error refreshing display sources: {e}")
+            time.sleep(self.ttl)
+
+
+# name -> (PIL filter, closest OpenCV interpolation)
+RESAMPLE_FILTERS = {
+    'nearest': (Image.Resampling.NEAREST, cv2.INTER_NEAREST),
+    'area': (Image.Resampling.BOX, cv2.INTER_AREA),
+    'box': (Image.Resampling.BOX, cv2.INTER_AREA),
+    'bilinear': (Image.Resampling.BILINEAR, cv2.INTER_LINEAR),
+    'hamming': (Image.Resampling.HAMMING, cv2.INTER_AREA),
+    'bicubic': (Image.Resampling.BICUBIC, cv2.INTER_CUBIC),
+    'lanczos': (Image.Resampling.LANCZOS, cv2.INTER_LANCZOS4),
+}
+
+ENCODERS = ('opencv', 'pil')
+
+
+@dataclass(frozen=True)
+class StreamSettings:
+    """Frame rate, size and quality for one MJPEG stream"""
+    fps: float = 30.0
+    max_width: int = 640
+    max_height: int = 480
+    resample: str = 'area'
+    quality: int = 85
+    encoder: str = 'opencv'
+    skip_unchanged: bool = True
+    keepalive: float = 2.0
+
+    def update(self, params):
+        """Return a copy with any recognised keys from params applied.
+
+        Raises ValueError for out-of-range or unknown values.
+        """
+        changes = {}
+        if params.get('fps') is not None:
+            changes['fps'] = float(params['fps'])
+            if not 0 < changes['fps'] <= 120:
+                raise ValueError('fps must be between 0 and 120')
+        for key in ('max_width', 'max_height'):
+            if params.get(key) is not None:
+                changes[key] = int(params[key])
+                if changes[key] < 16:
+                    raise ValueError(f'{key} must be at least 16')
+        if params.get('resample') is not None:
+            changes['resample'] = str(params['resample']).lower()
+            if changes['resample'] not in RESAMPLE_FILTERS:
+                raise ValueError(f"resample must be one of: {', '.join(RESAMPLE_FILTERS)}")
+        if params.get('quality') is not None:
+            changes['quality'] = int(params['quality'])
+            if not 1 <= changes['quality'] <= 100:
+                raise ValueError('quality must be between 1 and 100')
+        if params.get('encoder') is not None:
+            changes['encoder'] = str(params['encoder']).lower()
+            if changes['encoder'] not in ENCODERS:
+                raise ValueError(f"encoder must be one of: {', '.join(ENCODERS)}")
+        if params.get('skip_unchanged') is not None:
+            changes['skip_unchanged'] = str(params['skip_unchanged']).lower() not in ('0', 'false', 'no', 'off')
+        if params.get('keepalive') is not None:
+            changes['keepalive'] = float(params['keepalive'])
+            if changes['keepalive'] <= 0:
+                raise ValueError('keepalive must be greater than 0')
+        return replace(self, **changes)
+
+    def to_dict(self):
+        return {
+            'fps': self.fps,
+            'max_width': self.max_width,
+            'max_height': self.max_height,
+            'resample': self.resample,
+            'quality': self.quality,
+            'encoder': self.encoder,
+            'skip_unchanged': self.skip_unchanged,
+            'keepalive': self.keepalive,
+        }
+
+
+class ChangeDetector:
+    """Cheap frame-to-frame change detection on a block-averaged thumbnail.
+
+    The frame is shrunk with cv2.INTER_AREA so each cell is the mean of a
+    step x step block; every source pixel contributes, so even a 1px-wide
+    change moves its cell. A cell counts as changed when any channel's mean
+    moved by more than tolerance. Averaging already smooths sensor noise
+    and dithering, so the tolerance can stay small.
+    """
+
+    def __init__(self, step=8, tolerance=4):
+        self.step = step
+        self.tolerance = tolerance
+        self._previous = None
+
+    def reset(self):
+        self._previous = None
+
+    def update(self, frame):
+        """Compare frame with the previous one.
+
+        Returns (changed, bbox) where bbox is (x, y, w, h) in full-frame
+        pixels covering everything that changed, or None when nothing did.
+        """
+        height, width = frame.shape[:2]
+        cells = (-(-width // self.step), -(-height // self.step))
+        sample = cv2.resize(frame, cells, interpolation=cv2.INTER_AREA)
+        if sample.ndim == 3:
+            sample = sample[:, :, :3]
+        sample = sample.astype(np.int16)
+        previous, self._previous = self._previous, sample
+
+        if previous is None or previous.shape != sample.shape:
+            return True, (0, 0, width, height)
+
+        diff = np.abs(sample - previous)
+        if diff.ndim == 3:
+            diff = diff.max(axis=2)
+        mask = diff > self.tolerance
+        if not mask.any():
+            return False, None
+
+        rows = np.flatnonzero(mask.any(axis=1))
+        cols = np.flatnonzero(mask.any(axis=0))
+        # Cell i covers pixels [i * scale, (i + 1) * scale); pad a pixel for
+        # the partial blocks INTER_AREA blends at non-integer scales
+        scale_x, scale_y = width / cells[0], height / cells[1]
+        x0 = max(0, int(cols[0] * scale_x) - 1)
+        y0 = max(0, int(rows[0] * scale_y) - 1)
+        x1 = min(width, int(np.ceil((cols[-1] + 1) * scale_x)) + 1)
+        y1 = min(height, int(np.ceil((rows[-1] + 1) * scale_y)) + 1)
+        return True, (x0, y0, x1 - x0, y1 - y0)
+
+
+def frame_to_image(frame):
+    """Convert a BGR/BGRA frame array to an RGB PIL image"""
+    height, width = frame.shape[:2]
+    if frame.ndim == 2:
+        return Image.fromarray(frame)
+    raw_mode = 'BGRX' if frame.shape[2] == 4 else 'BGR'
+    return Image.frombuffer('RGB', (width, height), np.ascontiguousarray(frame), 'raw', raw_mode, 0, 1)
+
+
+def encode_frame_pil(frame, settings):
+    """Reference pipeline: PIL thumbnail + PIL JPEG encoder"""
+    img = frame if isinstance(frame, Image.Image) else frame_to_image(frame)
+    img.thumbnail((settings.max_width, settings.max_height), RESAMPLE_FILTERS[settings.resample][0])
+    
+    buffer = io.BytesIO()
+    img.save(buffer, format='JPEG', quality=settings.quality)
+    return buffer.getvalue()
+
+
+def encode_frame_opencv(frame, settings):
+    """Fast pipeline: cv2.resize + cv2.imencode straight from the BGR(A) array"""
+    height, width = frame.shape[:2]
+    scale = min(settings.max_width / width, settings.max_height / height)
+    if scale < 1:
+        size = (max(1, int(width * scale)), max(1, int(height * scale)))
+        frame = cv2.resize(frame, size, interpolation=RESAMPLE_FILTERS[settings.resample][1])
+    
+    ok, encoded = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, settings.quality])
+    if not ok:
+        raise RuntimeError('cv2.imencode failed')
+    return encoded.tobytes()
+
+
+def encode_frame(frame, settings):
+    """Downscale a captured frame and encode it as JPEG bytes.
+
+    Uses the OpenCV pipeline unless settings ask for PIL, and falls back
+    to PIL if OpenCV cannot handle the frame.
+    """
+    if settings.encoder == 'opencv' and isinstance(frame, np.ndarray):
+        try:
+            return encode_frame_opencv(frame, settings)
+        except Exception as e:
+            logger.warning(f"OpenCV encode failed, using PIL: {e}")
+    return encode_frame_pil(frame, settings)
+
+
+class FrameRing:
+    """Fixed-size ring buffer holding the most recent encoded frames"""
+
+    def __init__(self, size=4):
+        self._frames = [None] * size
+        self._size = size
+        self._seq = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    @property
+    def seq(self):
+        return self._seq
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def put(self, frame_bytes):
+        """Publish a new frame and wake every waiting subscriber"""
+        with self._cond:
+            self._seq += 1
+            self._frames[self._seq % self._size] = frame_bytes
+            self._cond.notify_all()
+
+    def wait_next(self, last_seq, timeout=1.0):
+        """Wait for a frame newer than last_seq.
+
+        Returns (seq, frame_bytes); frame_bytes is None on timeout or close.
+        Slow readers always jump to the newest frame instead of replaying
+        the backlog.
+        """
+        with self._cond:
+            self._cond.wait_for(lambda: self._seq > last_seq or self._closed, timeout)
+            if self._seq <= last_seq:
+                return last_seq, None
+            return self._seq, self._frames[self._seq % self._size]
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class _Output:
+    """One settings variant of a source's stream: its own pacing, change detection and ring"""
+
+    def __init__(self, producer, settings, ring_size):
+        self.producer = producer
+        self.settings = settings
+        self.interval = 1.0 / settings.fps
+        self.ring = FrameRing(ring_size)
+        self.subscribers = 0
+        self.idle_since = None
+        self.actual_fps = 0.0
+        self.frames_encoded = 0
+        self.frames_skipped = 0
+        self.dirty_rect = None
+        self.detector = ChangeDetector()
+        self.next_due = time.monotonic()
+        self.last_frame_at = None
+        self.last_sent_at = 0.0
+
+    @property
+    def key(self):
+        return (self.producer.source_id, self.settings)
+
+    def publish(self, frame, now):
+        """Detect change and encode frame for these settings, then schedule the next frame"""
+        try:
+            frame_bytes = None
+            changed = True
+            if self.settings.skip_unchanged and isinstance(frame, np.ndarray):
+                changed, bbox = self.detector.update(frame)
+                if changed:
+                    self.dirty_rect = bbox
+            # Unchanged frames skip the encode, except that a fresh one
+            # goes out every keepalive seconds so viewers and proxies see
+            # the stream alive and pick up any change too small to detect
+            if changed or now - self.last_sent_at >= self.settings.keepalive:
+                frame_bytes = self.producer.engine.encode(frame, self.settings)
+        except Exception as e:
+            logger.warning(f"Stream error on {self.producer.source_id}: {e}")
+            frame_bytes = None
+
+        if frame_bytes is not None:
+            self.ring.put(frame_bytes)
+            self.frames_encoded += 1
+            self.last_sent_at = now
+        else:
+            self.frames_skipped += 1
+
+        # Exponential moving average of this output's frame rate
+        if self.last_frame_at is not None and now > self.last_frame_at:
+            instant = 1.0 / (now - self.last_frame_at)
+            self.actual_fps = instant if not self.actual_fps else 0.8 * self.actual_fps + 0.2 * instant
+        self.last_frame_at = now
+
+        # If we fell behind, start over from now rather than bursting to catch up
+        self.next_due += self.interval
+        if self.next_due < now:
+            self.next_due = now
+
+
+class _Producer(threading.Thread):
+    """The one paced capture loop for a source, feeding an output per settings variant.
+
+    Each pass captures a single frame when any output is due and hands it
+    to every due output, so viewers asking for different frame rates,
+    sizes or quality still share one grab.
+    """
+
+    def __init__(self, engine, source_id):
+        super().__init__(name=f'stream-{source_id}', daemon=True)
+        self.engine = engine
+        self.source_id = source_id
+        # settings -> _Output; changed only under engine._lock
+        self.outputs = {}
+        self.stop_event = threading.Event()
+        # Set to cut a sleep short when an output is added or on stop
+        self.wakeup = threading.Event()
+
+    @property
+    def subscribers(self):
+        return sum(output.subscribers for output in list(self.outputs.values()))
+
+    def run(self):
+        idle_since = None
+
+        while not self.stop_event.is_set():
+            # Keep running briefly after the last viewer leaves so a page
+            # reload does not tear down and rebuild the capture pipeline
+            if self.subscribers == 0:
+                idle_since = idle_since or time.monotonic()
+                if time.monotonic() - idle_since > self.engine.linger:
+                    if self.engine._retire(self):
+                        break
+                    idle_since = None
+            else:
+                idle_since = None
+            self.engine._retire_outputs(self)
+
+            now = time.monotonic()
+            outputs = list(self.outputs.values())
+            if any(output.next_due <= now for output in outputs):
+                # Outputs due within half a frame ride along on this grab
+                # rather than triggering one of their own
+                due = [output for output in outputs if output.next_due - output.interval / 2 <= now]
+                try:
+                    frame = self.engine.capture(self.source_id)
+                except Exception as e:
+                    logger.warning(f"Stream error on {self.source_id}: {e}")
+                    frame = None
+
+                if frame is None:
+                    self.stop_event.wait(0.1)
+                    retry_at = time.monotonic()
+                    for output in due:
+                        output.next_due = retry_at
+                    continue
+
+                now = time.monotonic()
+                for output in due:
+                    output.publish(frame, now)
+
+            # Sleep until the next output is due
+            next_due = min((output.next_due for output in outputs), default=now + 0.1)
+            delay = next_due - time.monotonic()
+            if delay > 0:
+                self.wakeup.wait(delay)
+            self.wakeup.clear()
+
+        with self.engine._lock:
+            outputs = list(self.outputs.values())
+        for output in outputs:
+            output.ring.close()
+
+    def stop(self):
+        self.stop_event.set()
+        self.wakeup.set()
+
+
+class StreamEngine:
+    """Shares one capture producer per source across all subscribers.
+
+    Subscribers asking for the same settings also share one encode and
+    ring buffer; different settings get their own output of that producer.
+    """
+
+    def __init__(self, capture, encode, ring_size=4, linger=2.0):
+        self.capture = capture
+        self.encode = encode
+        self.ring_size = ring_size
+        self.linger = linger
+        self._producers = {}
+        # Only guards the producer and output tables; never held while capturing or encoding
+        self._lock = threading.Lock()
+
+    def _acquire(self, source_id, settings):
+        """Subscribe to the output for source_id and settings, starting what is missing"""
+        with self._lock:
+            producer = self._producers.get(source_id)
+            if producer is None:
+                producer = _Producer(self, source_id)
+                self._producers[source_id] = producer
+                producer.start()
+            output = producer.outputs.get(settings)
+            if output is None:
+                output = producer.outputs[settings] = _Output(producer, settings, self.ring_size)
+                producer.wakeup.set()
+            output.subscribers += 1
+            output.idle_since = None
+            return output
+
+    def _release(self, output):
+        with self._lock:
+            output.subscribers -= 1
+            if output.subscribers == 0:
+                output.idle_since = time.monotonic()
+
+    def _retire(self, producer):
+        """Remove an idle producer; returns False if a viewer arrived meanwhile"""
+        with self._lock:
+            if producer.subscribers > 0:
+                return False
+            if self._producers.get(producer.source_id) is producer:
+                del self._producers[producer.source_id]
+            return True
+
+    def _retire_outputs(self, producer):
+        """Drop outputs nobody has watched for linger seconds"""
+        now = time.monotonic()
+        with self._lock:
+            idle = [settings for settings, output in producer.outputs.items()
+                    if output.subscribers == 0 and output.idle_since
+                    and now - output.idle_since > self.linger]
+            retired = [producer.outputs.pop(settings) for settings in idle]
+        for output in retired:
+            output.ring.close()
+
+    def frames(self, get_source, get_settings):
+        """Yield (frame_bytes, actual_fps) for whatever get_source() names.
+
+        The source and settings are re-read between frames so changing
+        either moves existing viewers over without reconnecting. Viewers
+        of the same source share one capture; those asking for the same
+        settings share the encode too.
+        """
+        output = None
+        last_seq = 0
+        try:
+            while True:
+                source_id = get_source()
+                if not source_id:
+                    if output:
+                        self._release(output)
+                        output = None
+                    time.sleep(0.1)
+                    continue
+
+                settings = get_settings()
+                if output is None or output.key != (source_id, settings):
+                    if output:
+                        self._release(output)
+                    output = self._acquire(source_id, settings)
+                    last_seq = 0
+
+                last_seq, frame_bytes = output.ring.wait_next(last_seq)
+                if frame_bytes is not None:
+                    yield frame_bytes, output.actual_fps
+                elif output.ring.closed:
+                    # Output was stopped underneath us; start a fresh one
+                    self._release(output)
+                    output = None
+        finally:
+            if output:
+                self._release(output)
+
+    def stop(self):
+        """Stop every producer thread"""
+        with self._lock:
+            producers = list(self._producers.values())
+            self._producers.clear()
+        for producer in producers:
+            producer.stop()
+
+    def stats(self, source_id=None):
+        """Per-output viewer counts, frame counters and achieved FPS"""
+        with self._lock:
+            return [
+                {
+                    'source': p.source_id,
+                    'settings': o.settings.to_dict(),
+                    'subscribers': o.subscribers,
+                    'frames': o.ring.seq,
+                    'frames_encoded': o.frames_encoded,
+                    'frames_skipped': o.frames_skipped,
+                    'dirty_rect': o.dirty_rect,
+                    'actual_fps': round(o.actual_fps, 2),
+                }
+                for p in self._producers.values()
+                if source_id is None or p.source_id == source_id
+                for o in p.outputs.values()
+            ]
@@ -0,0 +1,139 @@
+"""Input backends for the mouse and keyboard blocks
+
+Every pyautogui call sleeps pyautogui.PAUSE (0.1 s) afterwards and checks
+the FAILSAFE corner first, which caps a mouse-heavy macro at about ten
+actions a second. Blocks therefore send input through a backend:
+
+  safe  today's behaviour: pyautogui's public API, with its pause and
+        fail-safe, and the keyboard library for keys
+  fast  pyautogui's public API with the pause turned off per call
+        (_pause=False), fail-safe still checked, and the keyboard library
+        for keys. A pyautogui without _pause gets the safe backend instead
+
+The mode is chosen with --input fast|safe, MACRO_AGENT_INPUT or
+POST /input-backend, and defaults to safe. Backends are created on first
+use, so the agent starts without pyautogui installed.
+"""
+
+import inspect
+import os
+import threading
+
+MODES = ('safe', 'fast')
+
+
+class SafeBackend:
+    """pyautogui's public API, pause and fail-safe included"""
+
+    name = 'safe'
+
+    def __init__(self):
+        import keyboard
+        import pyautogui
+        self.pyautogui = pyautogui
+        self.keyboard = keyboard
+
+    def position(self):
+        x, y = self.pyautogui.position()
+        return int(x), int(y)
+
+    def move(self, x, y):
+        self.pyautogui.moveTo(x, y)
+
+    def move_step(self, x, y):
+        """One step of a glide: no pause, but still fail-safe checked"""
+        self.pyautogui.moveTo(x, y, _pause=False)
+
+    def click(self, button='left', clicks=1, x=None, y=None):
+        self.pyautogui.click(x, y, clicks=clicks, button=button)
+
+    def mouse_down(self, button='left'):
+        self.pyautogui.mouseDown(button=button)
+
+    def mouse_up(self, button='left'):
+        self.pyautogui.mouseUp(button=button)
+
+    def scroll(self, amount):
+        self.pyautogui.scroll(amount)
+
+    def key_down(self, key):
+        self.keyboard.press(key)
+
+    def key_up(self, key):
+        self.keyboard.release(key)
+
+    def tap(self, keys):
+        """Press and release a key or 'ctrl+c' style combination"""
+        self.keyboard.press_and_release(keys)
+
+    def write(self, text):
+        self.keyboard.write(text)
+
+
+class FastBackend(SafeBackend):
+    """pyautogui's public API with its per-call pause skipped"""
+
+    name = 'fast'
+
+    # Every call the backend makes has to take _pause
+    CALLS = ('moveTo', 'click', 'mouseDown', 'mouseUp', 'scroll')
+
+    @classmethod
+    def supported(cls, pyautogui):
+        try:
+            return all('_pause' in inspect.signature(getattr(pyautogui, call)).parameters
+                       for call in cls.CALLS)
+        except (AttributeError, TypeError, ValueError):
+            return False
+
+    def move(self, x, y):
+        self.pyautogui.moveTo(x, y, _pause=False)
+
+    move_step = move
+
+    def click(self, button='left', clicks=1, x=None, y=None):
+        self.pyautogui.click(x, y, clicks=clicks, button=button, _pause=False)
+
+    def mouse_down(self, button='left'):
+        self.pyautogui.mouseDown(button=button, _pause=False)
+
+    def mouse_up(self, button='left'):
+        self.pyautogui.mouseUp(button=button, _pause=False)
+
+    def scroll(self, amount):
+        self.pyautogui.scroll(amount, _pause=False)
+
+
+BACKENDS = {'safe': SafeBackend, 'fast': FastBackend}
+
+_instances = {}
+_lock = threading.Lock()
+_mode = os.environ.get('MACRO_AGENT_INPUT', 'safe').lower()
+if _mode not in MODES:
+    _mode = 'safe'
+
+
+def get_backend(mode=None):
+    """The backend for mode (default: the current mode), created on first use"""
+    mode = mode or _mode
+    with _lock:
+        backend = _instances.get(mode)
+        if backend is None:
+            backend = BACKENDS[mode]()
+            if mode == 'fast' and not FastBackend.supported(backend.pyautogui):
+                backend = _instances.get('safe') or SafeBackend()
+                _instances['safe'] = backend
+            _instances[mode] = backend
+        return backend
+
+
+def set_mode(mode):
+    global _mode
+    mode = str(mode).lower()
+    if mode not in MODES:
+        raise ValueError(f"Input mode must be one of {', '.join(MODES)}: {mode}")
+    _mode = mode
+
+
+def current_mode():
+    return _mode
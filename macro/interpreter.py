@@ -0,0 +1,493 @@
+"""Server-side interpreter for whole block programs
+
+The editor sends a program tree once (POST /run) and the agent runs it
+natively, including the control and variable blocks that the per-block
+/execute endpoint leaves to the browser.
+
+Program format:
+    {
+        "program": [node, ...],          # one start stack, top to bottom
+        "variables": {"name": value}     # initial variable values
+    }
+
+    node  = {"type": "repeat", "params": {"times": expr}, "body": [node, ...]}
+    expr  = literal | {"type": "value", "params": {"value1": expr, ...}}
+
+Literals are plain JSON values. Nested value blocks (operators, variable
+getters, mouse_x, ...) are expression nodes evaluated on every use.
+
+Programs are compiled before they run: control flow, variables and
+operator expressions become closures, and constant block arguments are
+parsed once to the types declared in the block JSON. Block calls
+themselves go through the agent's execute_block, so they dispatch, trace
+and report errors exactly as /execute does. Compiled programs are cached
+by content hash, so re-running the same macro skips the compile.
+"""
+
+import hashlib
+import json
+import math
+import random
+import threading
+import time
+from collections import OrderedDict
+
+from cancel import CancelToken, Cancelled, cancel_scope
+
+
+# Blocks that are only ever evaluated for their value
+VARIABLE_GETTERS = {'varible', 'varible_value', 'get'}
+CONSOLE_BLOCKS = {'output', 'output_colour', 'output_icon', 'output_colour_icon'}
+
+
+def to_number(value):
+    if isinstance(value, bool):
+        return int(value)
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return 0
+    return int(number) if number.is_integer() else number
+
+
+def to_bool(value):
+    """Block truthiness: the strings 'False', '0' and '' are false"""
+    if isinstance(value, str):
+        return value.strip().lower() not in ('', 'false', '0')
+    return bool(value)
+
+
+def values_equal(a, b):
+    # Text fields hand over numbers as strings, so compare numerically when both sides allow it
+    try:
+        return float(a) == float(b)
+    except (TypeError, ValueError):
+        return str(a) == str(b)
+
+
+def arithmetic(p):
+    val1, val2 = to_number(p.get('value1', 0)), to_number(p.get('value2', 0))
+    operator = p.get('operator', '+')
+    if operator == '-':
+        return val1 - val2
+    if operator == '*':
+        return val1 * val2
+    if operator == '/':
+        return val1 / val2 if val2 != 0 else 0
+    if operator == 'mod':
+        return val1 % val2 if val2 != 0 else 0
+    if operator in ('OR', 'AND', 'XOR', 'NAND', 'NOR'):
+        return bitwise({**p, 'value1': val1, 'value2': val2})
+    return val1 + val2
+
+
+def bitwise(p):
+    val1, val2 = int(to_number(p.get('value1', 0))), int(to_number(p.get('value2', 0)))
+    operator = p.get('operator', 'OR')
+    if operator == 'OR':
+        return val1 | val2
+    if operator == 'AND':
+        return val1 & val2
+    if operator == 'XOR':
+        return val1 ^ val2
+    if operator == 'NAND':
+        return ~(val1 & val2)
+    if operator == 'NOR':
+        return ~(val1 | val2)
+    return 0
+
+
+def boolean_logic(p):
+    bool1, bool2 = to_bool(p.get('boolean1', True)), to_bool(p.get('boolean2', False))
+    operator = p.get('operator', 'OR')
+    if operator == '=':
+        return bool1 == bool2
+    if operator == '!=':
+        return bool1 != bool2
+    if operator == 'OR':
+        return bool1 or bool2
+    if operator == 'AND':
+        return bool1 and bool2
+    if operator == 'XOR':
+        return bool1 ^ bool2
+    if operator == 'NAND':
+        return not (bool1 and bool2)
+    if operator == 'NOR':
+        return not (bool1 or bool2)
+    return False
+
+
+def compare(p):
+    equal = values_equal(p.get('value1'), p.get('value2'))
+    return not equal if p.get('operator', '=') == '!=' else equal
+
+
+MATH_FUNCTIONS = {
+    'round': round, 'abs': abs, 'floor': math.floor, 'ceiling': math.ceil,
+    'sqrt': math.sqrt, 'sin': math.sin, 'cos': math.cos, 'tan': math.tan,
+    'asin': math.asin, 'acos': math.acos, 'atan': math.atan,
+    'In': math.log, 'log': math.log10, 'e^': math.exp, '10^': lambda v: 10 ** v,
+}
+
+
+def math_function(p):
+    func = MATH_FUNCTIONS.get(p.get('operator', 'round'))
+    value = to_number(p.get('value', 0))
+    try:
+        return func(value) if func else value
+    except (ValueError, OverflowError):
+        return 0
+
+
+def letter(p):
+    text = str(p.get('text', ''))
+    index = int(to_number(p.get('position', 1))) - 1
+    return text[index] if 0 <= index < len(text) else ''
+
+
+def random_between(p):
+    low, high = to_number(p.get('value1', 1)), to_number(p.get('value2', 10))
+    low, high = min(low, high), max(low, high)
+    if isinstance(low, int) and isinstance(high, int):
+        return random.randint(low, high)
+    return random.uniform(low, high)
+
+
+# Operator blocks evaluated natively; operators.py formats strings for display
+EXPRESSIONS = {
+    'value': arithmetic,
+    'bitwise_value': bitwise,
+    'bitwise_boolean': boolean_logic,
+    '=_!=': compare,
+    'boolean': lambda p: to_bool(p.get('state', True)),
+    'not_boolean': lambda p: not to_bool(p.get('boolean', True)),
+    'not_value': lambda p: ~int(to_number(p.get('value', 1))),
+    'stuff': math_function,
+    'random': random_between,
+    'join': lambda p: str(p.get('text1', '')) + str(p.get('text2', '')),
+    'letter': letter,
+    'length': lambda p: len(str(p.get('text', ''))),
+    'contain': lambda p: str(p.get('contains', '')) in str(p.get('text', '')),
+}
+
+
+ERROR_PREFIXES = ('Error', 'Unknown block type', 'Function ')
+
+# Steps between cancellation/max_steps checks; blocks that sleep or wait
+# still wake on cancel at once through the token
+CHECK_EVERY = 64
+
+
+def coerce_arg(value, arg_type):
+    """Pre-parse a literal argument to the type its block declares"""
+    if arg_type == 'number':
+        return to_number(value)
+    if arg_type == 'boolean':
+        return to_bool(value)
+    return value
+
+
+class CompiledProgram:
+    """A program tree flattened into a tuple of ready-to-call step closures"""
+
+    def __init__(self, steps, digest, node_count):
+        self.steps = steps
+        self.digest = digest
+        self.node_count = node_count
+
+    def __call__(self, ctx):
+        for step in self.steps:
+            step(ctx)
+
+
+def resolving_executor(resolve):
+    """An execute(block_type, params) over resolve(), reporting failures as execute_block does"""
+    def execute(block_type, params):
+        func, error = resolve(block_type)
+        if func is None:
+            return error
+        try:
+            return func(params)
+        except Cancelled:
+            raise
+        except Exception as e:
+            return f"Error executing {block_type}: {str(e)}"
+    return execute
+
+
+class ProgramCompiler:
+    """Turns program trees into CompiledPrograms and caches them by content hash.
+
+    Blocks run through execute(block_type, params), the agent's
+    execute_block; without one, they run through resolve() directly.
+    """
+
+    def __init__(self, resolve, arg_types=None, cache_size=64, execute=None):
+        self.execute = execute or resolving_executor(resolve)
+        self.arg_types = arg_types or {}
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self._node_count = 0
+
+    def compile(self, program):
+        digest = hashlib.sha1(json.dumps(program, sort_keys=True, separators=(',', ':')).encode()).hexdigest()
+        with self._lock:
+            compiled = self._cache.get(digest)
+            if compiled is not None:
+                self._cache.move_to_end(digest)
+                self.hits += 1
+                return compiled
+
+            self.misses += 1
+            self._node_count = 0
+            compiled = CompiledProgram(self.compile_stack(program), digest, self._node_count)
+            self._cache[digest] = compiled
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            return compiled
+
+    def compile_stack(self, nodes):
+        return tuple(step for step in (self.compile_node(node) for node in nodes or []) if step)
+
+    def compile_params(self, block_type, raw_params):
+        """Split params into a typed constant dict and a list of dynamic expressions"""
+        types = self.arg_types.get(block_type, {})
+        constants, dynamic = {}, []
+        for key, value in raw_params.items():
+            is_const, compiled = self.compile_expr(value)
+            if is_const:
+                constants[key] = coerce_arg(compiled, types.get(key))
+            else:
+                dynamic.append((key, compiled))
+        return constants, tuple(dynamic)
+
+    def compile_expr(self, expr):
+        """Return (True, literal) or (False, fn(ctx) -> value)"""
+        if not isinstance(expr, dict) or 'type' not in expr:
+            return True, expr
+
+        block_type = expr['type']
+        raw_params = expr.get('params') or {}
+        if block_type in VARIABLE_GETTERS:
+            name = raw_params.get('varible') or raw_params.get('VAR')
+            return False, lambda ctx: ctx.variables.get(name)
+
+        constants, dynamic = self.compile_params(block_type, raw_params)
+        handler = EXPRESSIONS.get(block_type)
+        if handler is None:
+            # Anything else (mouse_x, ...) is asked of its block module
+            call = self._block_call(block_type)
+        else:
+            def call(ctx, params):
+                return handler(params)
+
+        if not dynamic:
+            return False, lambda ctx: call(ctx, constants)
+
+        def evaluate(ctx):
+            params = dict(constants)
+            for key, fn in dynamic:
+                params[key] = fn(ctx)
+            return call(ctx, params)
+        return False, evaluate
+
+    def _block_call(self, block_type):
+        """fn(ctx, params) evaluating a value block through execute.
+
+        A failure (an exception, an error string or an unknown type) is added
+        to ctx.errors the way a statement's is, and the value is None so an
+        if skips its body and a while ends.
+        """
+        execute = self.execute
+
+        def call(ctx, params):
+            result = execute(block_type, params)
+            if isinstance(result, str) and result.startswith(ERROR_PREFIXES):
+                ctx.errors.append(result)
+                return None
+            return result
+        return call
+
+    def compile_node(self, node):
+        self._node_count += 1
+        block_type = node.get('type')
+        raw_params = node.get('params') or {}
+        body = self.compile_stack(node.get('body'))
+
+        def run_body(ctx):
+            for step in body:
+                step(ctx)
+
+        if block_type == 'start':
+            return None
+
+        if block_type == 'repeat':
+            times = self.expr_fn(raw_params.get('times', 1))
+
+            if not body:
+                # Nothing inside ticks, so check for a stop on every iteration
+                def step(ctx):
+                    ctx.tick()
+                    for _ in range(int(to_number(times(ctx)))):
+                        ctx.check_stop()
+            elif len(body) == 1:
+                only = body[0]
+
+                def step(ctx):
+                    ctx.tick()
+                    for _ in range(int(to_number(times(ctx)))):
+                        only(ctx)
+            else:
+                def step(ctx):
+                    ctx.tick()
+                    for _ in range(int(to_number(times(ctx)))):
+                        for inner in body:
+                            inner(ctx)
+            return step
+
+        if block_type == 'repeat_forever':
+            def step(ctx):
+                ctx.tick()
+                while True:
+                    run_body(ctx)
+                    ctx.tick()
+            return step
+
+        if block_type in ('if', 'while'):
+            condition = self.expr_fn(raw_params.get('condition', False))
+            if block_type == 'if':
+                def step(ctx):
+                    ctx.tick()
+                    if to_bool(condition(ctx)):
+                        run_body(ctx)
+            else:
+                def step(ctx):
+                    ctx.tick()
+                    while to_bool(condition(ctx)):
+                        run_body(ctx)
+                        ctx.tick()
+            return step
+
+        if block_type in ('set', 'change'):
+            name = raw_params.get('varible')
+            value = self.expr_fn(raw_params.get('value', 0 if block_type == 'set' else 1))
+            if not name:
+                return lambda ctx: ctx.tick()
+            if block_type == 'set':
+                def step(ctx):
+                    ctx.tick()
+                    ctx.variables[name] = value(ctx)
+            else:
+                def step(ctx):
+                    ctx.tick()
+                    ctx.variables[name] = to_number(ctx.variables.get(name, 0)) + to_number(value(ctx))
+            return step
+
+        constants, dynamic = self.compile_params(block_type, raw_params)
+
+        if block_type in CONSOLE_BLOCKS:
+            constants['block'] = block_type
+            if not dynamic:
+                def step(ctx):
+                    ctx.tick()
+                    ctx.emit(dict(constants))
+            else:
+                def step(ctx):
+                    ctx.tick()
+                    params = dict(constants)
+                    for key, fn in dynamic:
+                        params[key] = fn(ctx)
+                    ctx.emit(params)
+            return step
+
+        execute = self.execute
+
+        def step(ctx):
+            ctx.tick()
+            if dynamic:
+                params = dict(constants)
+                for key, fn in dynamic:
+                    params[key] = fn(ctx)
+            else:
+                # Block functions only read params, so one dict is shared by every call
+                params = constants
+            result = execute(block_type, params)
+            if isinstance(result, str):
+                if result.startswith(ERROR_PREFIXES):
+                    ctx.errors.append(result)
+            elif isinstance(result, dict) and result.get('action') == 'console_output':
+                ctx.emit(result)
+        return step
+
+    def expr_fn(self, expr):
+        is_const, compiled = self.compile_expr(expr)
+        if is_const:
+            return lambda ctx: compiled
+        return compiled
+
+
+class Interpreter:
+    """Runs one program against the agent's block functions"""
+
+    def __init__(self, compiler, variables=None, max_steps=None, on_output=None, token=None):
+        self.compiler = compiler
+        self.variables = dict(variables or {})
+        self.max_steps = max_steps
+        self.on_output = on_output
+        self.outputs = []
+        self.errors = []
+        self.steps = 0
+        # Step count at which tick() next runs checkpoint()
+        self.next_check = 0
+        # Cancelling the token also wakes blocks sleeping inside the run
+        self.token = token or CancelToken()
+
+    def stop(self):
+        """Ask the run to stop within CHECK_EVERY blocks (or straight out of a wait)"""
+        self.token.cancel()
+
+    def run(self, program):
+        """Compile (or fetch from cache) and execute the program; returns a summary dict"""
+        start = time.perf_counter()
+        compiled = self.compiler.compile(program)
+        stopped = False
+        try:
+            with cancel_scope(self.token):
+                compiled(self)
+        except Cancelled:
+            stopped = True
+        return {
+            'stopped': stopped,
+            'steps': self.steps,
+            'elapsed': round(time.perf_counter() - start, 6),
+            'program': compiled.digest,
+            'variables': self.variables,
+            'outputs': self.outputs,
+            'errors': self.errors,
+        }
+
+    def tick(self):
+        self.steps += 1
+        if self.steps >= self.next_check:
+            self.checkpoint()
+
+    def checkpoint(self):
+        """Cancellation and max_steps checks, run every CHECK_EVERY steps"""
+        self.token.check()
+        if self.max_steps is not None and self.steps > self.max_steps:
+            self.errors.append(f'Stopped after max_steps={self.max_steps}')
+            raise Cancelled()
+        self.next_check = self.steps + CHECK_EVERY
+        if self.max_steps is not None:
+            self.next_check = min(self.next_check, self.max_steps + 1)
+
+    def check_stop(self):
+        self.token.check()
+
+    def emit(self, output):
+        self.outputs.append(output)
+        if self.on_output:
+            self.on_output(output)
@@ -0,0 +1,127 @@
+"""Background job execution for the macro agent
+
+POST /jobs hands work to a bounded worker pool and returns straight away;
+clients poll GET /jobs/<id> for progress and DELETE /jobs/<id> to cancel.
+Cancellation is cooperative: the job's CancelToken is installed for the
+worker thread, so interruptible blocks (wait, key holds, key waits) wake
+up immediately and the job stops at the next block boundary.
+"""
+
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from cancel import CancelToken, Cancelled, cancel_scope
+
+
+class Job:
+    """One unit of background work and its observable state"""
+
+    def __init__(self, job_id, kind, target):
+        self.id = job_id
+        self.kind = kind
+        self.target = target
+        self.token = CancelToken()
+        self.state = 'queued'
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        # The target may replace this with a callable reporting live progress
+        self.progress = lambda: {}
+        # Called as listener(event, data) on state changes and whatever the target publishes
+        self.listeners = []
+
+    def publish(self, event, data):
+        for listener in list(self.listeners):
+            try:
+                listener(event, data)
+            except Exception:
+                pass
+
+    def notify(self):
+        """Publish the job's current state and progress as a 'job' event"""
+        self.publish('job', self.to_dict())
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'state': self.state,
+            'progress': self.progress(),
+            'result': self.result,
+            'error': self.error,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+
+
+class JobManager:
+    """Runs jobs on a fixed-size thread pool and keeps recent ones for polling"""
+
+    def __init__(self, max_workers=4, keep=100):
+        self.keep = keep
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._jobs = OrderedDict()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def submit(self, kind, target, listener=None):
+        """Queue target(job) and return the Job; target's return value becomes job.result"""
+        with self._lock:
+            job = Job(str(next(self._ids)), kind, target)
+            if listener:
+                job.listeners.append(listener)
+            self._jobs[job.id] = job
+            self._prune()
+        self._pool.submit(self._run, job)
+        return job
+
+    def _run(self, job):
+        if job.token.cancelled:
+            return
+        job.state = 'running'
+        job.started_at = time.time()
+        job.notify()
+        try:
+            with cancel_scope(job.token):
+                job.result = job.target(job)
+            job.state = 'cancelled' if job.token.cancelled else 'done'
+        except Cancelled:
+            job.state = 'cancelled'
+        except Exception as e:
+            job.state = 'failed'
+            job.error = str(e)
+        finally:
+            job.finished_at = time.time()
+            job.notify()
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id):
+        """Request cancellation; queued jobs are cancelled before they start"""
+        job = self.get(job_id)
+        if job is None:
+            return None
+        job.token.cancel()
+        if job.state == 'queued':
+            job.state = 'cancelled'
+            job.finished_at = time.time()
+            job.notify()
+        return job
+
+    def _prune(self):
+        # Forget the oldest finished jobs once we hold more than `keep`
+        finished = [jid for jid, j in self._jobs.items() if j.finished_at is not None]
+        for job_id in finished[:max(0, len(self._jobs) - self.keep)]:
+            del self._jobs[job_id]
@@ -1,9 +1,12 @@
 from flask import Flask, request, jsonify, Response
 from flask_cors import CORS
+import importlib.util
 import json
+import logging
 import sys
 import os
 from pathlib import Path
+from types import MappingProxyType
 import warnings
 
 # Suppress NVIDIA virtual camera warnings
@@ -11,25 +14,63 @@ warnings.filterwarnings('ignore', category=UserWarning)
 os.environ['OPENCV_VIDEOIO_PRIORITY_MSMF'] = '0'
 os.environ['OPENCV_VIDEOIO_DEBUG'] = '0'
 
-import mss
-import mss.tools
 import cv2
-import numpy as np
-from PIL import Image
-import io
 import threading
 import time
 
+from cancel import Cancelled, current_token
+from channel import ChannelHub
+from inputs import MODES as INPUT_MODES, current_mode as input_mode, set_mode as set_input_mode
+from interpreter import ERROR_PREFIXES, Interpreter, ProgramCompiler
+from jobs import JobManager
+from recorder import Recorder, build_timeline, program_to_xml, replay, timeline_to_program
+from scheduler import scheduler
+from display import SourceCatalog, StreamEngine, StreamSettings, capture_session, encode_frame, parse_source_id
+
 # Suppress OpenCV warnings
 cv2.setLogLevel(0)
 
-# Add blocks directory to path
+# Per-block tracing goes through this logger at DEBUG level; it is off by
+# default so high-rate macros don't spend their time writing to stdout.
+# Turn it on with --trace, MACRO_AGENT_TRACE=1 or POST /debug/trace.
+logger = logging.getLogger('macro_agent')
+_log_handler = logging.StreamHandler(sys.stdout)
+_log_handler.setFormatter(logging.Formatter('%(message)s'))
+logger.addHandler(_log_handler)
+logger.propagate = False
+logger.setLevel(logging.INFO)
+
+def set_trace(enabled):
+    """Enable or disable verbose per-block tracing"""
+    logger.setLevel(logging.DEBUG if enabled else logging.INFO)
+
+def trace_enabled():
+    return logger.isEnabledFor(logging.DEBUG)
+
+set_trace(os.environ.get('MACRO_AGENT_TRACE', '0').lower() in ('1', 'true', 'yes'))
+
+# Block modules are loaded by path under a 'blocks.' prefix rather than put on
+# sys.path, so blocks/keyboard.py and blocks/mouse.py don't shadow the
+# keyboard and mouse libraries they (and the recorder) import
 BLOCKS_DIR = Path(__file__).parent / 'blocks'
-sys.path.insert(0, str(BLOCKS_DIR))
+
+def load_block_module(py_file):
+    spec = importlib.util.spec_from_file_location(f'blocks.{py_file.stem}', py_file)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[spec.name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[spec.name]
+        raise
+    return module
 
 # Dynamically load all block category modules
 block_modules = {}
 block_category_map = {}
+block_module_names = {}
+block_arg_types = {}
+block_arg_inputs = {}
 
 print("\n" + "=" * 60)
 print("Loading block modules...")
@@ -42,7 +83,7 @@ for py_file in BLOCKS_DIR.glob('*.py'):
     
     module_name = py_file.stem
     try:
-        module = __import__(module_name)
+        module = load_block_module(py_file)
         block_modules[module_name] = module
         print(f"✓ Loaded {module_name} module")
     except Exception as e:
@@ -63,12 +104,51 @@ for json_file in BLOCKS_DIR.glob('*.json'):
                 block_name = block.get('name')
                 if block_name:
                     block_category_map[block_name] = category_name
+                    block_module_names[block_name] = json_file.stem
+                    # Remember which args are numeric/boolean so compiled programs can pre-parse them
+                    block_arg_types[block_name] = {
+                        arg['name']: 'number' if arg.get('input') == 'numbers' else arg.get('argType')
+                        for arg in block.get('args0', []) if arg.get('name')
+                    }
+                    # ...and which editor field each arg uses, for recordings exported as XML
+                    block_arg_inputs[block_name] = {
+                        arg['name']: arg.get('input', 'text') if arg.get('argType') == 'value' else arg.get('argType')
+                        for arg in block.get('args0', []) if arg.get('name')
+                    }
             
             print(f"✓ Mapped {len(blocks)} blocks from {json_file.name} to '{category_name}'")
     except Exception as e:
         print(f"✗ Failed to parse {json_file.name}: {e}")
 
+# Python reserved words can't be function names
+BLOCK_FUNCTION_NAMES = {'if': 'if_block', 'while': 'while_block'}
+
+def build_dispatch_table():
+    """Resolve every registered block type to its module function once"""
+    table = {}
+    for block_type, category in block_category_map.items():
+        # Category names usually match the module; otherwise use the module
+        # next to the block's JSON file (variable -> varible.py, ...)
+        module = block_modules.get(category) or block_modules.get(block_module_names.get(block_type))
+        func = getattr(module, BLOCK_FUNCTION_NAMES.get(block_type, block_type), None)
+        # Skip non-callables such as `random` imported into operators.py
+        if callable(func):
+            table[block_type] = func
+    return MappingProxyType(table)
+
+BLOCK_DISPATCH = build_dispatch_table()
+
+# Categories whose blocks drive the machine, so the editor sends them to the
+# agent; operators, control, variables and console are evaluated in the editor
+AGENT_CATEGORIES = ('mouse', 'keyboard', 'computer', 'vision', 'web and apps')
+# ...plus 'wait', which the editor leaves to the agent's timer
+AGENT_BLOCK_TYPES = tuple(sorted(
+    block_type for block_type in BLOCK_DISPATCH
+    if block_category_map.get(block_type) in AGENT_CATEGORIES or block_type == 'wait'
+))
+
 print(f"\n✓ Total blocks registered: {len(block_category_map)}")
+print(f"✓ Total blocks dispatchable: {len(BLOCK_DISPATCH)}")
 print(f"✓ Total modules loaded: {len(block_modules)}")
 print("=" * 60 + "\n")
 
@@ -78,7 +158,7 @@ CORS(app, resources={r"/*": {"origins": "*"}})
 
 # Load block definitions
 def load_block_definitions():
-    """Load all block JSON definitions from blocks directory"""
+    """Load all block JSON definitions from blocks directory, keyed by category name"""
     blocks = {}
     
     # Automatically load all JSON files from blocks directory
@@ -86,7 +166,7 @@ def load_block_definitions():
         try:
             with open(json_path, 'r', encoding='utf-8') as f:
                 data = json.load(f)
-                blocks.update(data)
+                blocks[data.get('name', json_path.stem)] = data
             print(f"✓ Loaded block definitions from {json_path.name}")
         except Exception as e:
             print(f"✗ Error loading {json_path.name}: {e}")
@@ -97,189 +177,54 @@ BLOCK_DEFINITIONS = load_block_definitions()
 
 # Display capture state
 current_capture_source = None
+current_stream_settings = StreamSettings()
 capture_lock = threading.Lock()
 
-def get_display_sources():
+# Source list is probed in the background and served from cache
+source_catalog = SourceCatalog(capture_session, ttl=60.0)
+
+def get_display_sources(refresh=False):
     """Get all available display sources (screens, windows, cameras)"""
-    sources = {
-        'screens': [],
-        'windows': [],
-        'cameras': []
-    }
-    
-    # Get screens using mss
-    try:
-        with mss.mss() as sct:
-            for i, monitor in enumerate(sct.monitors[1:], 1):  # Skip monitor 0 (all monitors)
-                sources['screens'].append({
-                    'id': f'screen-{i}',
-                    'name': f'Screen {i}',
-                    'width': monitor['width'],
-                    'height': monitor['height']
-                })
-    except Exception as e:
-        print(f"Error getting screens: {e}")
-    
-    # Get windows (platform-specific)
-    try:
-        if sys.platform == 'win32':
-            import win32gui
-            import win32process
-            import win32con
-            
-            def enum_windows_callback(hwnd, windows):
-                if win32gui.IsWindowVisible(hwnd) and win32gui.GetWindowText(hwnd):
-                    # Skip certain system windows
-                    title = win32gui.GetWindowText(hwnd)
-                    if title and len(title) > 0:
-                        try:
-                            _, pid = win32process.GetWindowThreadProcessId(hwnd)
-                            windows.append({
-                                'id': f'window-{hwnd}',
-                                'name': title,
-                                'hwnd': hwnd
-                            })
-                        except:
-                            pass
-                return True
-            
-            windows_list = []
-            win32gui.EnumWindows(enum_windows_callback, windows_list)
-            sources['windows'] = windows_list[:50]  # Limit to 50 windows
-    except Exception as e:
-        print(f"Error getting windows: {e}")
-    
-    # Get cameras
-    try:
-        for i in range(5):  # Check first 5 camera indices
-            cap = cv2.VideoCapture(i)
-            if cap.isOpened():
-                sources['cameras'].append({
-                    'id': f'camera-{i}',
-                    'name': f'Camera {i}'
-                })
-                cap.release()
-    except Exception as e:
-        print(f"Error getting cameras: {e}")
-    
-    return sources
+    return source_catalog.get(refresh=refresh)
 
 def capture_frame(source_id):
     """Capture a single frame from the specified source"""
     try:
-        if source_id.startswith('screen-'):
-            # Capture screen
-            screen_num = int(source_id.split('-')[1])
-            with mss.mss() as sct:
-                monitor = sct.monitors[screen_num]
-                screenshot = sct.grab(monitor)
-                img = Image.frombytes('RGB', screenshot.size, screenshot.rgb)
-                return img
-        
-        elif source_id.startswith('window-'):
-            # Capture window (Windows only)
-            if sys.platform == 'win32':
-                import win32gui
-                import win32ui
-                from ctypes import windll
-                
-                hwnd = int(source_id.split('-')[1])
-                
-                # Get window dimensions
-                left, top, right, bottom = win32gui.GetWindowRect(hwnd)
-                width = right - left
-                height = bottom - top
-                
-                # Get window device context
-                hwndDC = win32gui.GetWindowDC(hwnd)
-                mfcDC = win32ui.CreateDCFromHandle(hwndDC)
-                saveDC = mfcDC.CreateCompatibleDC()
-                
-                # Create bitmap
-                saveBitMap = win32ui.CreateBitmap()
-                saveBitMap.CreateCompatibleBitmap(mfcDC, width, height)
-                saveDC.SelectObject(saveBitMap)
-                
-                # Capture window
-                result = windll.user32.PrintWindow(hwnd, saveDC.GetSafeHdc(), 3)
-                
-                if result:
-                    bmpinfo = saveBitMap.GetInfo()
-                    bmpstr = saveBitMap.GetBitmapBits(True)
-                    
-                    img = Image.frombuffer(
-                        'RGB',
-                        (bmpinfo['bmWidth'], bmpinfo['bmHeight']),
-                        bmpstr, 'raw', 'BGRX', 0, 1
-                    )
-                else:
-                    img = None
-                
-                # Cleanup
-                win32gui.DeleteObject(saveBitMap.GetHandle())
-                saveDC.DeleteDC()
-                mfcDC.DeleteDC()
-                win32gui.ReleaseDC(hwnd, hwndDC)
-                
-                return img
-        
-        elif source_id.startswith('camera-'):
-            # Capture from camera
-            camera_num = int(source_id.split('-')[1])
-            cap = cv2.VideoCapture(camera_num)
-            if cap.isOpened():
-                ret, frame = cap.read()
-                cap.release()
-                if ret:
-                    # Convert BGR to RGB
-                    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                    img = Image.fromarray(frame_rgb)
-                    return img
-    
+        return capture_session.grab(source_id)
     except Exception as e:
-        print(f"Error capturing frame: {e}")
+        logger.warning(f"Error capturing frame: {e}")
     
     return None
 
-def generate_stream():
+# One shared capture/encode thread per active source, fanned out to every viewer
+stream_engine = StreamEngine(capture_frame, encode_frame)
+
+def generate_stream(settings_override=None):
     """Generate MJPEG stream from current capture source"""
-    global current_capture_source
+    def get_settings():
+        if settings_override:
+            return current_stream_settings.update(settings_override)
+        return current_stream_settings
     
-    while True:
-        with capture_lock:
-            if not current_capture_source:
-                time.sleep(0.1)
-                continue
-            
-            img = capture_frame(current_capture_source)
-            
-            if img:
-                # Resize for streaming (max 640x480)
-                img.thumbnail((640, 480), Image.Resampling.LANCZOS)
-                
-                # Convert to JPEG
-                buffer = io.BytesIO()
-                img.save(buffer, format='JPEG', quality=85)
-                frame_bytes = buffer.getvalue()
-                
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-            else:
-                time.sleep(0.1)
+    for frame_bytes, actual_fps in stream_engine.frames(lambda: current_capture_source, get_settings):
+        yield (b'--frame\r\n'
+               b'Content-Type: image/jpeg\r\n'
+               b'X-Actual-FPS: ' + f'{actual_fps:.2f}'.encode() + b'\r\n\r\n' + frame_bytes + b'\r\n')
 
 @app.route('/display/sources', methods=['GET'])
 def get_sources():
-    """Get all available display sources"""
+    """Get all available display sources from cache; ?refresh=1 re-probes first"""
     try:
-        sources = get_display_sources()
+        refresh = request.args.get('refresh', '0').lower() in ('1', 'true', 'yes')
+        sources = get_display_sources(refresh=refresh)
         return jsonify(sources)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/display/set-source', methods=['POST'])
 def set_source():
-    """Set the current capture source"""
-    global current_capture_source
+    """Set the current capture source and, optionally, stream settings"""
+    global current_capture_source, current_stream_settings
     
     try:
         data = request.get_json()
@@ -288,37 +233,68 @@ def set_source():
         if not source_id:
             return jsonify({'error': 'No source_id provided'}), 400
         
+        try:
+            # Source ids may carry a region of interest: screen-1@x,y,w,h
+            parse_source_id(source_id)
+            settings = current_stream_settings.update(data)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
         with capture_lock:
             current_capture_source = source_id
+            current_stream_settings = settings
         
         return jsonify({
             'success': True,
-            'source': source_id
+            'source': source_id,
+            'settings': settings.to_dict(),
+            'streams': stream_engine.stats(source_id)
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/display/stream')
 def stream():
-    """Stream video from current source"""
+    """Stream video from current source.
+
+    Query parameters fps, max_width, max_height, resample and quality
+    override the settings from /display/set-source for this viewer only.
+    """
+    overrides = {key: request.args[key] for key in StreamSettings().to_dict() if key in request.args}
+    try:
+        current_stream_settings.update(overrides)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
     return Response(
-        generate_stream(),
+        generate_stream(overrides),
         mimetype='multipart/x-mixed-replace; boundary=frame'
     )
 
+@app.route('/display/stats', methods=['GET'])
+def stream_stats():
+    """Report viewers and achieved FPS for every active stream"""
+    return jsonify({
+        'source': current_capture_source,
+        'settings': current_stream_settings.to_dict(),
+        'streams': stream_engine.stats()
+    })
+
 @app.route('/status', methods=['GET'])
 def status():
     """Check if agent is running"""
     return jsonify({
         'status': 'running',
         'version': '1.0.0',
-        'blocks_loaded': len(BLOCK_DEFINITIONS)
+        'blocks_loaded': len(BLOCK_DEFINITIONS),
+        'trace': trace_enabled(),
+        'input': input_mode()
     })
 
 @app.route('/blocks', methods=['GET'])
 def get_blocks():
-    """Return available block definitions"""
-    return jsonify(BLOCK_DEFINITIONS)
+    """Return the block definitions by category and the block types the editor should send here"""
+    return jsonify({'categories': BLOCK_DEFINITIONS, 'types': list(AGENT_BLOCK_TYPES)})
 
 @app.route('/execute', methods=['POST'])
 def execute_command():
@@ -333,7 +309,8 @@ def execute_command():
         block_id = data.get('id')
         params = data.get('params', {})
         
-        print(f"Executing: {block_type} (ID: {block_id}) with params: {params}")
+        if trace_enabled():
+            logger.debug(f"Executing: {block_type} (ID: {block_id}) with params: {params}")
         
         # Execute the command based on block type
         result = execute_block(block_type, params)
@@ -345,15 +322,76 @@ def execute_command():
         })
         
     except Exception as e:
-        print(f"Error executing command: {e}")
+        logger.error(f"Error executing command: {e}")
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
+def run_sequence(blocks, stop_on_failure=False):
+    """Yield one result dict per block as it finishes.
+
+    A block fails if it raises or returns one of execute_block's error
+    strings; with stop_on_failure nothing after the first failure runs.
+    Inside a job, cancelling its token raises Cancelled between blocks.
+    """
+    token = current_token()
+    for block in blocks:
+        if token is not None:
+            token.check()
+        try:
+            result = execute_block(block.get('type'), block.get('params', {}))
+            entry = {
+                'success': not (isinstance(result, str) and result.startswith(ERROR_PREFIXES)),
+                'result': result,
+                'block_id': block.get('id')
+            }
+        except Cancelled:
+            raise
+        except Exception as e:
+            entry = {
+                'success': False,
+                'error': str(e),
+                'block_id': block.get('id')
+            }
+        yield entry
+        if stop_on_failure and not entry['success']:
+            return
+
+def sequence_report(blocks, stop_on_failure=False, summary_only=False):
+    """Yield per-block results (unless summary_only) followed by one summary dict"""
+    started = time.perf_counter()
+    succeeded = failed = 0
+    for entry in run_sequence(blocks, stop_on_failure):
+        if entry['success']:
+            succeeded += 1
+        else:
+            failed += 1
+        if not summary_only:
+            yield entry
+    yield {
+        'summary': True,
+        'total': len(blocks),
+        'completed': succeeded + failed,
+        'succeeded': succeeded,
+        'failed': failed,
+        'stopped': succeeded + failed < len(blocks),
+        'elapsed': round(time.perf_counter() - started, 6)
+    }
+
+def is_truthy(value):
+    """Option flags arrive as JSON booleans or as '1'/'true'/'yes' strings"""
+    return value if isinstance(value, bool) else str(value).lower() in ('1', 'true', 'yes')
+
 @app.route('/execute-sequence', methods=['POST'])
 def execute_sequence():
-    """Execute a sequence of macro blocks"""
+    """Execute a sequence of macro blocks.
+
+    Options (in the body, or as query parameters):
+        stream          emit NDJSON, one line per block as it completes, then a summary line
+        stop_on_failure stop at the first block that fails
+        summary_only    skip per-block results and report counts only
+    """
     try:
         data = request.get_json()
         blocks = data.get('blocks', [])
@@ -361,79 +399,375 @@ def execute_sequence():
         if not blocks:
             return jsonify({'error': 'No blocks provided'}), 400
         
-        results = []
-        for block in blocks:
-            try:
-                block_type = block.get('type')
-                params = block.get('params', {})
-                result = execute_block(block_type, params)
-                results.append({
-                    'success': True,
-                    'result': result,
-                    'block_id': block.get('id')
-                })
-            except Exception as e:
-                results.append({
-                    'success': False,
-                    'error': str(e),
-                    'block_id': block.get('id')
-                })
+        def option(name):
+            return is_truthy(data.get(name, request.args.get(name, False)))
+        
+        report = sequence_report(blocks, option('stop_on_failure'), option('summary_only'))
+        
+        if option('stream'):
+            lines = (json.dumps(entry) + '\n' for entry in report)
+            return Response(lines, mimetype='application/x-ndjson',
+                            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+        
+        *results, summary = report
+        response = {'success': True, 'summary': summary}
+        if results:
+            response['results'] = results
+        return jsonify(response)
+        
+    except Exception as e:
+        logger.error(f"Error executing sequence: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
+# Programs currently running through /run, so /run/stop can reach them
+active_runs = set()
+active_runs_lock = threading.Lock()
+
+@app.route('/run', methods=['POST'])
+def run_program():
+    """Run a whole block program (control flow, variables and all) on the agent"""
+    try:
+        data = request.get_json()
+        program = data.get('program') if data else None
+        
+        if not isinstance(program, list):
+            return jsonify({'error': 'No program provided'}), 400
+        
+        max_steps = data.get('max_steps')
+        runner = Interpreter(program_compiler, data.get('variables'),
+                             max_steps=int(max_steps) if max_steps is not None else None)
+        with active_runs_lock:
+            active_runs.add(runner)
+        try:
+            summary = runner.run(program)
+        finally:
+            with active_runs_lock:
+                active_runs.discard(runner)
         
         return jsonify({
             'success': True,
-            'results': results
+            **summary
         })
         
     except Exception as e:
-        print(f"Error executing sequence: {e}")
+        logger.error(f"Error running program: {e}")
         return jsonify({
             'success': False,
             'error': str(e)
         }), 500
 
-def execute_block(block_type, params):
-    """Execute a single block based on its type by calling the appropriate module function"""
-    
-    # Debug: print all params received
-    print(f"Block type: {block_type}")
-    print(f"Params received: {params}")
+@app.route('/run/stop', methods=['POST'])
+def stop_programs():
+    """Stop every program running through /run"""
+    with active_runs_lock:
+        runners = list(active_runs)
+    for runner in runners:
+        runner.stop()
+    return jsonify({'success': True, 'stopped': len(runners)})
+
+def resolve_block_function(block_type):
+    """Return (function, error message) for a block type; one of them is None"""
+    func = BLOCK_DISPATCH.get(block_type)
+    if func:
+        return func, None
     
-    # Get the category for this block type from the dynamically built map
     category = block_category_map.get(block_type)
-    
-    if category and category in block_modules:
-        # Get the function from the module
-        # Handle special cases where Python reserved words are used
-        func_name = block_type
-        if block_type == 'if':
-            func_name = 'if_block'
-        elif block_type == 'while':
-            func_name = 'while_block'
-        
-        func = getattr(block_modules[category], func_name, None)
-        if func:
-            try:
-                result = func(params)
-                print(f"✓ Executed: {result}")
-                return result
-            except Exception as e:
-                error_msg = f"Error executing {block_type}: {str(e)}"
-                print(f"✗ {error_msg}")
-                return error_msg
-        else:
-            return f"Function {func_name} not found in {category} module"
+    if category:
+        return None, f"Function {BLOCK_FUNCTION_NAMES.get(block_type, block_type)} not found in {category} module"
     
     # Operators blocks (usually client-side)
     if block_type.startswith('operator_'):
-        return "Operator block (client-side)"
+        return None, "Operator block (client-side)"
     
     # Unknown block type
-    return f"Unknown block type: {block_type}"
+    return None, f"Unknown block type: {block_type}"
+
+def execute_block(block_type, params):
+    """Execute a single block based on its type by calling the appropriate module function"""
+    func = BLOCK_DISPATCH.get(block_type)
+    if func is None:
+        return resolve_block_function(block_type)[1]
+    
+    trace = trace_enabled()
+    if trace:
+        logger.debug(f"Block type: {block_type}")
+        logger.debug(f"Params received: {params}")
+    
+    try:
+        result = func(params)
+    except Cancelled:
+        raise
+    except Exception as e:
+        error_msg = f"Error executing {block_type}: {str(e)}"
+        logger.warning(f"✗ {error_msg}")
+        return error_msg
+    
+    if trace:
+        logger.debug(f"✓ Executed: {result}")
+    return result
+
+# Compiled /run programs, cached by content hash; their blocks run through execute_block
+program_compiler = ProgramCompiler(resolve_block_function, block_arg_types, execute=execute_block)
+
+# Long-running work (waits, key holds, whole programs) runs here instead of in the request thread
+job_manager = JobManager(max_workers=4)
+
+# Programs run thousands of blocks a second, too many to publish one by one
+PROGRAM_PROGRESS_INTERVAL = 0.25
+
+def program_job(program, variables=None, max_steps=None):
+    """Job target running a /run-style program; progress is steps and outputs so far"""
+    def target(job):
+        runner = Interpreter(program_compiler, variables, max_steps=max_steps, token=job.token,
+                             on_output=lambda output: job.publish('console', {'job': job.id, **output}))
+        job.progress = lambda: {'steps': runner.steps, 'outputs': len(runner.outputs),
+                                'errors': len(runner.errors)}
+        finished = threading.Event()
+
+        def report_progress():
+            # Publish every interval while the program is moving; a long wait stays quiet
+            last = job.progress()
+            while not finished.wait(PROGRAM_PROGRESS_INTERVAL):
+                progress = job.progress()
+                if progress != last:
+                    last = progress
+                    job.notify()
+
+        threading.Thread(target=report_progress, name=f'job-{job.id}-progress', daemon=True).start()
+        try:
+            return runner.run(program)
+        finally:
+            finished.set()
+    return target
+
+def sequence_job(blocks, stop_on_failure=False):
+    """Job target running blocks one after another, reporting them as /execute-sequence does"""
+    def target(job):
+        results = []
+        job.progress = lambda: {'completed': len(results), 'total': len(blocks)}
+        for entry in sequence_report(blocks, stop_on_failure):
+            if entry.get('summary'):
+                return {'results': results, 'summary': entry}
+            results.append(entry)
+            result = entry.get('result')
+            if isinstance(result, dict) and result.get('action') == 'console_output':
+                job.publish('console', {'job': job.id, **result})
+            job.notify()
+    return target
+
+def start_job(data, listener=None):
+    """Submit the job described by a /jobs body; returns None if it describes nothing runnable"""
+    if isinstance(data.get('program'), list):
+        max_steps = data.get('max_steps')
+        return job_manager.submit('program', program_job(
+            data['program'], data.get('variables'),
+            int(max_steps) if max_steps is not None else None), listener)
+    if data.get('blocks'):
+        return job_manager.submit('sequence', sequence_job(
+            data['blocks'], is_truthy(data.get('stop_on_failure', False))), listener)
+    if data.get('type'):
+        return job_manager.submit('block', sequence_job([data]), listener)
+    return None
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """Start a job and return its id straight away.
+
+    Body is one of {"program": [...], "variables": {...}}, {"blocks": [...]}
+    (optionally with "stop_on_failure": true) or a single
+    {"type": ..., "params": {...}} block.
+    """
+    job = start_job(request.get_json(silent=True) or {})
+    if job is None:
+        return jsonify({'error': 'No program, blocks or block type provided'}), 400
+    return jsonify({'success': True, 'job': job.to_dict()}), 202
+
+@app.route('/jobs', methods=['GET'])
+def list_jobs():
+    """List recent jobs, newest last"""
+    return jsonify({'jobs': [job.to_dict() for job in job_manager.list()]})
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Report a job's state, progress and (once finished) result"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': f'Unknown job: {job_id}'}), 404
+    return jsonify({'job': job.to_dict()})
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def cancel_job(job_id):
+    """Cancel a job; running blocks are interrupted at their next wait or block boundary"""
+    job = job_manager.cancel(job_id)
+    if job is None:
+        return jsonify({'error': f'Unknown job: {job_id}'}), 404
+    return jsonify({'success': True, 'job': job.to_dict()})
+
+# Keyboard/mouse recorder; the last finished recording is kept for /record/replay
+recorder = Recorder()
+last_timeline = None
+
+@app.route('/record/start', methods=['POST'])
+def start_recording():
+    """Start recording keyboard and mouse input.
+
+    Body (optional): {"stop_key": "esc"}. Pressing the stop key also ends
+    the recording and is not recorded itself; fetch the result with /record/stop.
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        recorder.start(stop_key=data.get('stop_key', 'esc'))
+    except (ImportError, RuntimeError) as e:
+        return jsonify({'success': False, 'error': str(e)}), 409
+    return jsonify({'success': True, 'recording': True})
+
+@app.route('/record', methods=['GET'])
+def recording_status():
+    """Whether a recording is running and how many events it has"""
+    log = recorder.log
+    return jsonify({
+        'recording': recorder.recording,
+        'events': len(log) if log is not None else 0,
+        'elapsed': round(time.time() - recorder.started_at, 3) if recorder.recording else None
+    })
+
+@app.route('/record/stop', methods=['POST'])
+def stop_recording():
+    """Stop recording and return it as blocks.
+
+    Body (optional): {"move_epsilon": 3}, how far (px) thinned mouse paths
+    may stray from the recorded one, and {"drop_stop_click": true}, whether
+    the click that sent this request (and the pointer path to it) is
+    dropped from the recording. The response has "program" (a /run
+    program) and "xml" (Blockly XML for the editor).
+    """
+    global last_timeline
+    data = request.get_json(silent=True) or {}
+    log = recorder.stop(drop_stop_click=is_truthy(data.get('drop_stop_click', True)))
+    if log is None:
+        return jsonify({'success': False, 'error': 'Nothing has been recorded'}), 409
+
+    last_timeline = build_timeline(log, float(data.get('move_epsilon', 3)))
+    program = timeline_to_program(last_timeline)
+    return jsonify({
+        'success': True,
+        'events': len(log),
+        'log_bytes': log.nbytes,
+        'blocks': len(program),
+        'duration': round(log.duration, 3),
+        'program': program,
+        'xml': program_to_xml(program, block_arg_inputs)
+    })
+
+@app.route('/record/replay', methods=['POST'])
+def replay_recording():
+    """Replay the last recording at its recorded timing as a job; its result reports timing error"""
+    timeline = last_timeline
+    if not timeline:
+        return jsonify({'error': 'Nothing has been recorded'}), 409
+    job = job_manager.submit('replay', lambda job: replay(timeline))
+    return jsonify({'success': True, 'job': job.to_dict()}), 202
+
+def handle_channel_command(channel, command):
+    """Run one pipelined channel command; the reply goes back as its 'result' event.
+
+    Commands are {"type", "params"} blocks, {"job": <a /jobs body>} whose
+    updates and console output are pushed to the channel, or {"cancel": job_id}.
+    """
+    if 'job' in command:
+        job = start_job(command['job'] or {}, listener=channel.push)
+        if job is None:
+            return {'success': False, 'error': 'No program, blocks or block type provided'}
+        return {'success': True, 'job': job.id}
+    
+    if 'cancel' in command:
+        job = job_manager.cancel(str(command['cancel']))
+        if job is None:
+            return {'success': False, 'error': f"Unknown job: {command['cancel']}"}
+        return {'success': True, 'job': job.id}
+    
+    return {'success': True, 'result': execute_block(command.get('type'), command.get('params', {}))}
+
+channel_hub = ChannelHub(handle_channel_command)
+
+@app.route('/channel', methods=['POST'])
+def open_channel():
+    """Open a persistent channel; follow up with GET /channel/<id>/events"""
+    channel = channel_hub.open()
+    return jsonify({'success': True, 'channel': channel.id})
+
+@app.route('/channel/<channel_id>/events')
+def channel_events(channel_id):
+    """Server-sent event stream of results, console output and job updates"""
+    channel = channel_hub.get(channel_id)
+    if channel is None:
+        return jsonify({'error': f'Unknown channel: {channel_id}'}), 404
+    return Response(channel.stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/channel/<channel_id>/commands', methods=['POST'])
+def channel_commands(channel_id):
+    """Queue one command or a list of them; replies arrive on the event stream.
+
+    The body is parsed regardless of content type so the editor can post
+    text/plain and skip the CORS preflight.
+    """
+    channel = channel_hub.get(channel_id)
+    if channel is None:
+        return jsonify({'error': f'Unknown channel: {channel_id}'}), 404
+    try:
+        commands = json.loads(request.get_data() or b'[]')
+    except ValueError as e:
+        return jsonify({'error': f'Invalid JSON: {e}'}), 400
+    if isinstance(commands, dict):
+        commands = [commands]
+    channel.submit(commands)
+    return jsonify({'success': True, 'queued': len(commands)}), 202
+
+@app.route('/channel/<channel_id>', methods=['DELETE'])
+def close_channel(channel_id):
+    """Close a channel and end its event stream"""
+    if channel_hub.close(channel_id) is None:
+        return jsonify({'error': f'Unknown channel: {channel_id}'}), 404
+    return jsonify({'success': True})
+
+@app.route('/debug/trace', methods=['GET', 'POST'])
+def debug_trace():
+    """Get or set verbose per-block tracing: POST {"enabled": true}"""
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        set_trace(bool(data.get('enabled', not trace_enabled())))
+    return jsonify({'trace': trace_enabled()})
+
+@app.route('/timing', methods=['GET'])
+def timing_stats():
+    """How late timed blocks (wait, key holds, glide steps, replays) hit their deadlines.
+
+    Pass ?reset=1 to clear the counters after reading them.
+    """
+    stats = scheduler.stats()
+    if request.args.get('reset', '0').lower() in ('1', 'true', 'yes'):
+        scheduler.reset()
+    return jsonify(stats)
+
+@app.route('/input-backend', methods=['GET', 'POST'])
+def input_backend():
+    """Get or set how mouse/keyboard blocks send input: {"mode": "safe" | "fast"}"""
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        try:
+            set_input_mode(data.get('mode', ''))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+    return jsonify({'mode': input_mode(), 'modes': list(INPUT_MODES)})
 
 @app.route('/shutdown', methods=['POST'])
 def shutdown():
     """Shutdown the agent"""
-    print("Shutting down agent...")
+    logger.info("Shutting down agent...")
     func = request.environ.get('werkzeug.server.shutdown')
     if func is None:
         raise RuntimeError('Not running with the Werkzeug Server')
@@ -443,12 +777,19 @@ def shutdown():
 def main():
     """Start the agent server"""
     PORT = 9001
+    if '--trace' in sys.argv[1:]:
+        set_trace(True)
+    if '--input' in sys.argv[1:-1]:
+        set_input_mode(sys.argv[sys.argv.index('--input') + 1])
+    
     print("=" * 60)
     print("🤖 MACRO AGENT STARTED")
     print("=" * 60)
     print(f"📡 Listening on: http://localhost:{PORT}")
     print(f"📦 Blocks loaded: {len(BLOCK_DEFINITIONS)}")
     print(f"🌐 CORS enabled for all origins")
+    print(f"🔎 Block tracing: {'on' if trace_enabled() else 'off (run with --trace to enable)'}")
+    print(f"🖱️  Input backend: {input_mode()} (--input fast skips pyautogui's pause)")
     print(f"⏹️  Press Ctrl+C to stop")
     print("=" * 60)
     print()
@@ -0,0 +1,157 @@
+"""Template matching for the vision blocks
+
+Templates are loaded once as grayscale image pyramids and cached by path,
+reloading only when the file's mtime changes. A search matches the
+downscaled template against a downscaled screen first (each pyramid level
+quarters the work), then re-scores the best candidate at full resolution
+in a small window around it, so the confidence it reports is the
+full-resolution one.
+"""
+
+import os
+import threading
+from collections import OrderedDict, namedtuple
+
+import cv2
+import numpy as np
+
+# Stop shrinking once the template's short side would drop below this
+MIN_PYRAMID_SIDE = 16
+MAX_PYRAMID_LEVELS = 3
+# A coarse score this far under the threshold is not worth refining
+COARSE_SLACK = 0.2
+
+
+class Match(namedtuple('Match', 'x y width height score')):
+    __slots__ = ()
+
+    @property
+    def center(self):
+        return self.x + self.width // 2, self.y + self.height // 2
+
+
+def to_gray(frame):
+    """Grayscale copy of a BGR/BGRA frame (or the frame itself if already gray)"""
+    if frame.ndim == 2:
+        return frame
+    code = cv2.COLOR_BGRA2GRAY if frame.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+    return cv2.cvtColor(frame, code)
+
+
+def build_pyramid(gray, levels):
+    pyramid = [gray]
+    for _ in range(levels):
+        pyramid.append(cv2.pyrDown(pyramid[-1]))
+    return pyramid
+
+
+class Template:
+    """A grayscale template and its downscaled copies"""
+
+    def __init__(self, path, mtime, gray):
+        self.path = path
+        self.mtime = mtime
+        self.height, self.width = gray.shape
+        levels = 0
+        while levels < MAX_PYRAMID_LEVELS and min(self.width, self.height) >> (levels + 1) >= MIN_PYRAMID_SIDE:
+            levels += 1
+        self.pyramid = build_pyramid(gray, levels)
+
+    @property
+    def levels(self):
+        return len(self.pyramid) - 1
+
+
+def load_gray(path):
+    # imdecode rather than imread so non-ASCII Windows paths work
+    data = np.fromfile(path, dtype=np.uint8)
+    gray = cv2.imdecode(data, cv2.IMREAD_GRAYSCALE)
+    if gray is None:
+        raise ValueError(f'Not an image: {path}')
+    return gray
+
+
+class TemplateCache:
+    """Loaded templates keyed by path, least recently used dropped first"""
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._templates = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        path = os.path.abspath(os.path.expanduser(str(path)))
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            raise FileNotFoundError(f'Image not found: {path}')
+
+        with self._lock:
+            template = self._templates.get(path)
+            if template is not None and template.mtime == mtime:
+                self._templates.move_to_end(path)
+                return template
+
+        template = Template(path, mtime, load_gray(path))
+        with self._lock:
+            self._templates[path] = template
+            self._templates.move_to_end(path)
+            while len(self._templates) > self.max_entries:
+                self._templates.popitem(last=False)
+        return template
+
+    def clear(self):
+        with self._lock:
+            self._templates.clear()
+
+
+def best_match(image, template):
+    """(score, (x, y)) of the best TM_CCOEFF_NORMED match, or None if it doesn't fit"""
+    if image.shape[0] < template.shape[0] or image.shape[1] < template.shape[1]:
+        return None
+    result = cv2.matchTemplate(image, template, cv2.TM_CCOEFF_NORMED)
+    _, score, _, location = cv2.minMaxLoc(result)
+    return score, location
+
+
+def find_template(gray, template, threshold=0.8, pyramid=True):
+    """Locate template in a grayscale frame, returning a Match or None.
+
+    Coordinates are relative to the frame. With pyramid=False the search
+    runs at full resolution only.
+    """
+    level = min(template.levels, MAX_PYRAMID_LEVELS) if pyramid else 0
+    # Don't shrink a small search area below the template
+    while level and (gray.shape[0] >> level < template.pyramid[level].shape[0] * 2
+                     or gray.shape[1] >> level < template.pyramid[level].shape[1] * 2):
+        level -= 1
+
+    if level == 0:
+        found = best_match(gray, template.pyramid[0])
+        if found is None or found[0] < threshold:
+            return None
+        score, (x, y) = found
+        return Match(x, y, template.width, template.height, score)
+
+    coarse = gray
+    for _ in range(level):
+        coarse = cv2.pyrDown(coarse)
+    found = best_match(coarse, template.pyramid[level])
+    if found is None or found[0] < threshold - COARSE_SLACK:
+        return None
+
+    # Refine around the coarse hit at full resolution
+    scale = 1 << level
+    margin = scale * 2
+    cx, cy = found[1][0] * scale, found[1][1] * scale
+    left, top = max(0, cx - margin), max(0, cy - margin)
+    right = min(gray.shape[1], cx + template.width + margin)
+    bottom = min(gray.shape[0], cy + template.height + margin)
+    refined = best_match(gray[top:bottom, left:right], template.pyramid[0])
+    if refined is None or refined[0] < threshold:
+        return None
+    score, (x, y) = refined
+    return Match(left + x, top + y, template.width, template.height, score)
+
+
+templates = TemplateCache()
@@ -0,0 +1,389 @@
+"""Macro recorder: capture keyboard and mouse input and turn it into blocks
+
+While recording, keyboard and mouse hooks append every event to an
+EventLog, a set of parallel typed arrays (timestamp, kind, x, y, key) that
+costs ~21 bytes per event instead of an object each. Held keys' auto-repeat
+is dropped as it arrives. On stop, the log becomes a timeline of block
+actions: runs of mouse movement are thinned with Ramer-Douglas-Peucker
+(measured against where the pointer was at each moment) into glides that
+keep the recorded timing, quick down/up pairs become press_key /
+press_mouse, and the gaps between actions become wait blocks (a double
+click stays two press_mouse blocks with its recorded gap between them). The timeline can be emitted as a /run program, as Blockly
+XML the editor's File > Load accepts, or replayed directly against
+absolute deadlines.
+"""
+
+import threading
+import time
+from array import array
+from xml.sax.saxutils import escape
+
+from inputs import get_backend
+from scheduler import scheduler
+
+MOVE, MOUSE_DOWN, MOUSE_UP, SCROLL, KEY_DOWN, KEY_UP = range(6)
+
+# A down/up pair closer together than this with nothing in between is a tap/click
+TAP_TIME = 0.3
+# Pointer updates per second while replaying a glide, as the glide block uses
+GLIDE_RATE = 120
+
+
+class EventLog:
+    """Recorded input events, stored column-wise in typed arrays"""
+
+    def __init__(self):
+        self.times = array('d')
+        self.kinds = array('B')
+        self.xs = array('i')
+        self.ys = array('i')
+        self.codes = array('i')
+        self.names = []
+        self._name_ids = {}
+
+    def append(self, t, kind, x=0, y=0, name=None):
+        code = -1
+        if name is not None:
+            code = self._name_ids.get(name)
+            if code is None:
+                code = self._name_ids[name] = len(self.names)
+                self.names.append(name)
+        self.times.append(t)
+        self.kinds.append(kind)
+        self.xs.append(x)
+        self.ys.append(y)
+        self.codes.append(code)
+
+    def __len__(self):
+        return len(self.times)
+
+    def __iter__(self):
+        names = self.names
+        for t, kind, x, y, code in zip(self.times, self.kinds, self.xs, self.ys, self.codes):
+            yield t, kind, x, y, names[code] if code >= 0 else None
+
+    def truncate(self, length):
+        """Drop every event from index length on"""
+        for column in (self.times, self.kinds, self.xs, self.ys, self.codes):
+            del column[length:]
+
+    @property
+    def duration(self):
+        return self.times[-1] if self.times else 0.0
+
+    @property
+    def nbytes(self):
+        return sum(a.itemsize * len(a) for a in (self.times, self.kinds, self.xs, self.ys, self.codes))
+
+
+def simplify_path(points, epsilon):
+    """Indices of (x, y, t) points to keep so gliding between them stays within epsilon px.
+
+    Ramer-Douglas-Peucker, but each point is measured against where a
+    constant-speed glide between the kept points would be at that point's
+    time, not against the nearest spot on the line. A pause or a change of
+    speed along a straight drag is therefore kept too.
+    """
+    if len(points) < 3 or epsilon <= 0:
+        return list(range(len(points)))
+    keep = {0, len(points) - 1}
+    stack = [(0, len(points) - 1)]
+    while stack:
+        first, last = stack.pop()
+        (x1, y1, t1), (x2, y2, t2) = points[first], points[last]
+        dx, dy, dt = x2 - x1, y2 - y1, t2 - t1
+        worst, worst_distance = None, epsilon
+        for i in range(first + 1, last):
+            px, py, pt = points[i]
+            fraction = (pt - t1) / dt if dt > 0 else 0.0
+            distance = ((px - x1 - dx * fraction) ** 2 + (py - y1 - dy * fraction) ** 2) ** 0.5
+            if distance > worst_distance:
+                worst, worst_distance = i, distance
+        if worst is not None:
+            keep.add(worst)
+            stack.append((first, worst))
+            stack.append((worst, last))
+    return sorted(keep)
+
+
+def build_timeline(log, move_epsilon=3):
+    """[(t, block_type, params)] for a recording, in time order"""
+    events = list(log)
+    timeline = []
+    i = 0
+    while i < len(events):
+        t, kind, x, y, name = events[i]
+
+        if kind == MOVE:
+            run_end = i
+            while run_end + 1 < len(events) and events[run_end + 1][1] == MOVE:
+                run_end += 1
+            run = events[i:run_end + 1]
+            previous = None
+            for k in simplify_path([(e[2], e[3], e[0]) for e in run], move_epsilon):
+                t, _, x, y, _ = run[k]
+                duration = round(t - previous, 3) if previous is not None else 0
+                if duration > 0:
+                    # Glide from the last kept point, starting when the pointer left it
+                    timeline.append((previous, 'glide', {'X': x, 'Y': y, 'TIME': duration}))
+                else:
+                    timeline.append((t, 'move', {'X': x, 'Y': y}))
+                previous = t
+            i = run_end + 1
+            continue
+
+        following = events[i + 1] if i + 1 < len(events) else None
+        is_tap = (following is not None and following[4] == name and following[0] - t <= TAP_TIME
+                  and (kind, following[1]) in ((KEY_DOWN, KEY_UP), (MOUSE_DOWN, MOUSE_UP)))
+        if kind == KEY_DOWN:
+            timeline.append((t, 'press_key', {'key': name}) if is_tap else (t, 'key_down', {'key': name}))
+        elif kind == KEY_UP:
+            timeline.append((t, 'key_up', {'key': name}))
+        elif kind == MOUSE_DOWN and is_tap:
+            timeline.append((t, 'press_mouse', {'button': name}))
+        elif kind == MOUSE_DOWN:
+            timeline.append((t, 'mouse_down', {'button': name}))
+        elif kind == MOUSE_UP:
+            timeline.append((t, 'mouse_up', {'button': name}))
+        elif kind == SCROLL:
+            timeline.append((t, 'scroll_mouse', {'direction': 'up' if y > 0 else 'down', 'amount': abs(y)}))
+        i += 2 if is_tap else 1
+    return timeline
+
+
+def timeline_to_program(timeline):
+    """A /run program: each action preceded by a wait for the gap since the last one.
+
+    A glide's TIME counts towards the gap before the next action. Waits are
+    rounded to the millisecond against the running total rather than per
+    gap, so rounding never accumulates over a long recording.
+    """
+    program = []
+    elapsed = 0.0
+    for t, block_type, params in timeline:
+        gap = round(t - elapsed, 3)
+        if gap > 0:
+            program.append({'type': 'wait', 'params': {'duration': gap}})
+            elapsed += gap
+        program.append({'type': block_type, 'params': dict(params)})
+        if block_type == 'glide':
+            elapsed += params['TIME']
+    return program
+
+
+SHADOW_FIELDS = {'numbers': ('math_number', 'NUM'), 'key': ('key_field', 'KEY'), 'text': ('text_field', 'TEXT')}
+
+
+def program_to_xml(program, arg_inputs, x=40, y=40):
+    """Blockly XML for a start block followed by program's blocks.
+
+    arg_inputs maps block type -> {arg name: input kind} ('numbers', 'key',
+    'text' or 'dropdown') as declared in the blocks' JSON definitions.
+    """
+    opens, closes = [f'<xml xmlns="https://developers.google.com/blockly/xml"><block type="start" x="{x}" y="{y}">'], []
+    for node in program:
+        inputs = arg_inputs.get(node['type'], {})
+        parts = [f'<next><block type="{escape(node["type"])}">']
+        for name, value in node['params'].items():
+            kind = inputs.get(name, 'text')
+            if kind == 'dropdown':
+                parts.append(f'<field name="{escape(name)}">{escape(str(value))}</field>')
+            else:
+                shadow, field = SHADOW_FIELDS.get(kind, SHADOW_FIELDS['text'])
+                parts.append(f'<value name="{escape(name)}"><shadow type="{shadow}">'
+                             f'<field name="{field}">{escape(str(value))}</field></shadow></value>')
+        opens.append(''.join(parts))
+        closes.append('</block></next>')
+    return ''.join(opens) + ''.join(reversed(closes)) + '</block></xml>'
+
+
+class Recorder:
+    """Hooks keyboard and mouse input into an EventLog between start() and stop()"""
+
+    def __init__(self):
+        self.log = None
+        self.started_at = None
+        self.stop_key = None
+        self._hooks = None
+        # Held keys by scan code -> the name their key_down was recorded with
+        self._held = {}
+        self._position = (0, 0)
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+    @property
+    def recording(self):
+        return self._hooks is not None
+
+    def start(self, stop_key='esc'):
+        """Start a new recording; pressing stop_key (not recorded) ends it"""
+        import keyboard
+        import mouse
+
+        with self._lock:
+            if self._hooks is not None:
+                raise RuntimeError('Already recording')
+            self.log = EventLog()
+            self.stop_key = stop_key or None
+            self._held.clear()
+            self._position = mouse.get_position()
+            self._stopped.clear()
+            self.started_at = time.time()
+            self._hooks = (keyboard.hook(self._on_key), mouse.hook(self._on_mouse))
+
+    def stop(self, drop_stop_click=False):
+        """Unhook and return the EventLog.
+
+        Events stamped after the stop request are dropped. With
+        drop_stop_click, so is the click that asked for the stop (a Stop
+        button in the editor) and the pointer movement leading up to it.
+        """
+        import keyboard
+        import mouse
+
+        with self._lock:
+            if self._hooks is None:
+                return self.log
+            key_hook, mouse_hook = self._hooks
+            self._hooks = None
+            stopped_at = time.time() - self.started_at
+        keyboard.unhook(key_hook)
+        mouse.unhook(mouse_hook)
+        # Hook callbacks already past their _hooks check may still append; wait them out
+        with self._lock:
+            log = self.log
+            end = len(log)
+            while end and log.times[end - 1] > stopped_at:
+                end -= 1
+            if drop_stop_click:
+                end = self._before_last_click(end)
+            log.truncate(end)
+        self._stopped.set()
+        return log
+
+    def _before_last_click(self, end):
+        """Where the log ends without its trailing click and the moves that led to it"""
+        kinds = self.log.kinds
+
+        def skip_moves(i):
+            while i and kinds[i - 1] == MOVE:
+                i -= 1
+            return i
+
+        i = skip_moves(end)
+        if not i or kinds[i - 1] != MOUSE_UP:
+            return end
+        i = skip_moves(i - 1)
+        if not i or kinds[i - 1] != MOUSE_DOWN:
+            return end
+        return skip_moves(i - 1)
+
+    def _on_key(self, event):
+        name = event.name or f'scan{event.scan_code}'
+        if self.stop_key and name == self.stop_key:
+            if event.event_type == 'down':
+                # Unhooking from inside the hook thread would deadlock it
+                threading.Thread(target=self.stop, daemon=True).start()
+            return
+        with self._lock:
+            if self._hooks is None:
+                return
+            t = event.time - self.started_at
+            # The name changes with Shift ('A' down, 'a' up), the scan code doesn't
+            key = event.scan_code if event.scan_code is not None else name
+            if event.event_type == 'down':
+                if key in self._held:
+                    return  # auto-repeat
+                self._held[key] = name
+                self.log.append(t, KEY_DOWN, name=name)
+            else:
+                # Release the key under the name it was pressed with
+                self.log.append(t, KEY_UP, name=self._held.pop(key, name))
+
+    def _on_mouse(self, event):
+        with self._lock:
+            if self._hooks is None:
+                return
+            t = event.time - self.started_at
+            event_type = getattr(event, 'event_type', None)
+            if hasattr(event, 'x'):
+                self._position = (event.x, event.y)
+                self.log.append(t, MOVE, event.x, event.y)
+            elif hasattr(event, 'delta'):
+                # Scrolls keep the wheel delta in the y column
+                self.log.append(t, SCROLL, self._position[0], int(event.delta))
+            elif event_type in ('down', 'double'):
+                self.log.append(t, MOUSE_DOWN, *self._position, name=event.button)
+            elif event_type == 'up':
+                self.log.append(t, MOUSE_UP, *self._position, name=event.button)
+
+    def wait_stopped(self, timeout=None):
+        return self._stopped.wait(timeout)
+
+
+def send_action(block_type, params):
+    """Perform one timeline action through the input backend selected for the agent"""
+    backend = get_backend()
+    if block_type == 'move':
+        backend.move(params['X'], params['Y'])
+    elif block_type == 'glide':
+        start_x, start_y = backend.position()
+        x, y = params['X'], params['Y']
+        for fraction in scheduler.ticks(params['TIME'], GLIDE_RATE, 'replay'):
+            backend.move_step(round(start_x + (x - start_x) * fraction), round(start_y + (y - start_y) * fraction))
+    elif block_type == 'press_mouse':
+        backend.click(params['button'])
+    elif block_type == 'mouse_down':
+        backend.mouse_down(params['button'])
+    elif block_type == 'mouse_up':
+        backend.mouse_up(params['button'])
+    elif block_type == 'scroll_mouse':
+        backend.scroll(params['amount'] if params['direction'] == 'up' else -params['amount'])
+    elif block_type == 'press_key':
+        backend.tap(params['key'])
+    elif block_type == 'key_down':
+        backend.key_down(params['key'])
+    elif block_type == 'key_up':
+        backend.key_up(params['key'])
+
+
+# Hold action -> (release action, the param naming what is held)
+RELEASES = {'key_down': ('key_up', 'key'), 'mouse_down': ('mouse_up', 'button')}
+RELEASE_FIELDS = dict(RELEASES.values())
+
+
+def replay(timeline, perform=send_action):
+    """Run timeline's actions at their recorded offsets; perform(block_type, params) does each one.
+
+    Deadlines are absolute from the start of the replay, so a slow action
+    delays only itself. Keys and buttons still held when the replay stops,
+    whether it finished, failed or was cancelled, are released on the way
+    out. Returns timing error stats in milliseconds.
+    """
+    errors = []
+    held = {}  # (release, field, value), in press order
+    start = time.perf_counter()
+    try:
+        for t, block_type, params in timeline:
+            errors.append(scheduler.sleep_until(start + t, 'replay'))
+            if block_type in RELEASES:
+                release, field = RELEASES[block_type]
+                held[release, field, params[field]] = None
+            perform(block_type, params)
+            if block_type in RELEASE_FIELDS:
+                field = RELEASE_FIELDS[block_type]
+                held.pop((block_type, field, params[field]), None)
+    finally:
+        for release, field, value in reversed(held):
+            try:
+                perform(release, {field: value})
+            except Exception:
+                pass
+    if not errors:
+        return {'actions': 0, 'mean_error_ms': 0.0, 'max_error_ms': 0.0, 'duration': 0.0}
+    return {
+        'actions': len(errors),
+        'mean_error_ms': round(sum(errors) / len(errors) * 1000, 3),
+        'max_error_ms': round(max(errors) * 1000, 3),
+        'duration': round(time.perf_counter() - start, 3),
+    }
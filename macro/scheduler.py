@@ -0,0 +1,129 @@
+"""High-precision timing for blocks that wait, hold or animate
+
+time.sleep() and Event.wait() wake up late by anything from a fraction of
+a millisecond to a whole timer tick (~15 ms on older Windows Pythons), and
+per-call sleeps let that lateness pile up. The Scheduler instead waits for
+absolute time.perf_counter() deadlines: it sleeps (cancellably, through
+the caller's CancelToken) until shortly before the deadline, then spins for
+the rest. The spin margin adapts to how late this machine's sleeps actually
+wake, but is capped at a few milliseconds (and a quarter of a tick for
+ticks()) so a coarse timer can't turn every wait into a busy loop; on
+Windows the system timer is raised to 1 ms instead. Every wait records how far it missed its deadline, per label, so
+drift can be checked with GET /timing.
+"""
+
+import atexit
+import sys
+import threading
+import time
+from collections import deque
+
+from cancel import current_token
+
+MIN_SPIN = 0.001
+MAX_SPIN = 0.004
+
+
+def raise_timer_resolution():
+    """Ask Windows for 1 ms timer ticks while the agent runs, so sleeps wake on time"""
+    if sys.platform != 'win32':
+        return
+    try:
+        import ctypes
+        winmm = ctypes.WinDLL('winmm')
+    except (ImportError, OSError):
+        return
+    if winmm.timeBeginPeriod(1) == 0:
+        atexit.register(winmm.timeEndPeriod, 1)
+
+
+class Scheduler:
+    """Deadline-based sleeps shared by every block thread, with per-label error stats"""
+
+    def __init__(self, spin=0.002, history=200):
+        self.spin = spin
+        self._oversleep = 0.0
+        self._stats = {}
+        self._recent = deque(maxlen=history)
+        self._lock = threading.Lock()
+
+    def sleep_until(self, deadline, label=None, max_spin=MAX_SPIN):
+        """Wait for a perf_counter deadline; returns how late it was reached, in seconds"""
+        token = current_token()
+        spin = min(self.spin, max_spin)
+        remaining = deadline - time.perf_counter()
+        if remaining > spin:
+            coarse = remaining - spin
+            slept_from = time.perf_counter()
+            if token is not None:
+                token.sleep(coarse)
+            else:
+                time.sleep(coarse)
+            self._learn(time.perf_counter() - slept_from - coarse)
+        elif token is not None:
+            token.check()
+        while time.perf_counter() < deadline:
+            pass
+        error = time.perf_counter() - deadline
+        if label:
+            self.record(label, error)
+        return error
+
+    def sleep(self, seconds, label=None):
+        """Wait seconds from now against a deadline; returns the timing error"""
+        return self.sleep_until(time.perf_counter() + max(0.0, seconds), label)
+
+    def ticks(self, duration, rate, label=None):
+        """Yield the fraction done (0 < f <= 1) at a fixed rate for duration seconds.
+
+        Tick deadlines are fixed from the start, so time spent between ticks
+        doesn't push later ticks back.
+        """
+        count = max(1, round(duration * rate))
+        # Spin for at most a quarter of a tick, leaving the rest to other threads
+        max_spin = min(MAX_SPIN, duration / count / 4)
+        start = time.perf_counter()
+        for i in range(1, count + 1):
+            self.sleep_until(start + duration * i / count, label, max_spin)
+            yield i / count
+
+    def _learn(self, oversleep):
+        # Smoothed oversleep that rises quickly and decays slowly; spin for twice that
+        with self._lock:
+            weight = 0.25 if oversleep > self._oversleep else 0.05
+            self._oversleep += (oversleep - self._oversleep) * weight
+            self.spin = min(MAX_SPIN, max(MIN_SPIN, self._oversleep * 2))
+
+    def record(self, label, error):
+        error_ms = error * 1000
+        with self._lock:
+            entry = self._stats.get(label)
+            if entry is None:
+                entry = self._stats[label] = {'steps': 0, 'total_ms': 0.0, 'max_error_ms': 0.0}
+            entry['steps'] += 1
+            entry['total_ms'] += error_ms
+            entry['max_error_ms'] = max(entry['max_error_ms'], error_ms)
+            self._recent.append((label, round(error_ms, 3)))
+
+    def stats(self):
+        """Per-label step count, mean and max lateness in ms, plus the most recent steps"""
+        with self._lock:
+            labels = {
+                label: {
+                    'steps': entry['steps'],
+                    'mean_error_ms': round(entry['total_ms'] / entry['steps'], 3),
+                    'max_error_ms': round(entry['max_error_ms'], 3),
+                }
+                for label, entry in self._stats.items()
+            }
+            recent = [{'label': label, 'error_ms': error} for label, error in self._recent]
+        return {'spin_ms': round(self.spin * 1000, 3), 'labels': labels, 'recent': recent}
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self._recent.clear()
+
+
+raise_timer_resolution()
+scheduler = Scheduler()
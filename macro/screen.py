@@ -0,0 +1,129 @@
+"""Screen reads for blocks that look at the screen
+
+Blocks capture through display.capture_session, the same pooled
+CaptureSession behind the display stream, so they share its open mss
+contexts and its region-of-interest model. A block's region is a display
+source id: 'screen-1@x,y,w,h' (or just 'x,y,w,h', meaning that rectangle of
+the primary screen), 'window-<hwnd>' and so on; blank or 'all' is the whole
+primary screen. On the primary screen, region coordinates are the same
+screen coordinates the mouse blocks use.
+
+Pixel and colour probes read from `frames`, a FrameCache that grabs the
+monitor at most once per max_age seconds. Every probe in one pass of a
+macro loop then looks at the same capture instead of grabbing its own.
+"""
+
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from display import capture_session, crop_frame, parse_source_id
+
+PRIMARY_SCREEN = 'screen-1'
+
+
+def region_source(value, screen=PRIMARY_SCREEN):
+    """Capture source id for a block's region argument.
+
+    Blank or 'all' -> screen; 'x,y,w,h' -> that rectangle of screen;
+    anything else must already be a display source id such as
+    'screen-2@0,0,800,600' or 'window-1234'. Raises ValueError otherwise.
+    """
+    text = '' if value is None else str(value).strip()
+    if text.lower() in ('', 'all', 'screen', 'none'):
+        return screen
+    if text[0].isdigit():
+        try:
+            x, y, w, h = (int(float(v)) for v in text.split(','))
+        except ValueError:
+            raise ValueError(f'Region must be x,y,width,height or a source id like screen-1@x,y,w,h: {value}')
+        text = f'{screen}@{x},{y},{w},{h}'
+    parse_source_id(text)
+    return text
+
+
+def parse_colour(value):
+    """'#rrggbb', 'rrggbb' or 'r,g,b' -> (b, g, r), the order frames are stored in"""
+    text = str(value).strip().lstrip('#')
+    try:
+        if ',' in text:
+            r, g, b = (int(float(v)) for v in text.split(','))
+        else:
+            r, g, b = int(text[0:2], 16), int(text[2:4], 16), int(text[4:6], 16)
+    except ValueError:
+        raise ValueError(f'Colour must be #rrggbb or r,g,b: {value}')
+    return b, g, r
+
+
+def format_colour(bgr):
+    b, g, r = (int(v) for v in bgr)
+    return f"#{r:02x}{g:02x}{b:02x}"
+
+
+def colour_fraction(view, bgr, tolerance):
+    """Fraction of a BGR/BGRA view whose colour channels are all within tolerance of bgr"""
+    tolerance = int(tolerance)
+    # Any alpha channel always passes
+    extra = view.shape[2] - 3 if view.ndim == 3 else 0
+    lower = np.array([max(0, c - tolerance) for c in bgr] + [0] * extra, dtype=np.uint8)
+    upper = np.array([min(255, c + tolerance) for c in bgr] + [255] * extra, dtype=np.uint8)
+    mask = cv2.inRange(view, lower, upper)
+    return cv2.countNonZero(mask) / mask.size
+
+
+class FrameCache:
+    """The latest whole frame of each source, shared by every reader for max_age seconds.
+
+    A region ('screen-1@x,y,w,h') is cropped out of its base source's
+    cached frame, so probes over different regions still share one capture.
+    Frames are read-only; a new grab replaces the cached frame rather than
+    writing into it, so a caller holding an older one is unaffected.
+    """
+
+    def __init__(self, grab=capture_session.grab_at, max_age=0.03):
+        self.grab = grab
+        self.max_age = max_age
+        self.grabs = 0
+        # base source id -> (frame, origin, taken_at)
+        self._frames = {}
+        self._lock = threading.Lock()
+
+    def get(self, source=PRIMARY_SCREEN):
+        """(frame, origin) for a base source id, grabbing a new frame if the cached one is too old"""
+        with self._lock:
+            cached = self._frames.get(source)
+            if cached is None or time.monotonic() - cached[2] >= self.max_age:
+                frame, origin = self.grab(source)
+                if frame is None:
+                    raise RuntimeError(f'Could not capture {source}')
+                frame.flags.writeable = False
+                cached = self._frames[source] = (frame, origin, time.monotonic())
+                self.grabs += 1
+            return cached[0], cached[1]
+
+    def pixel(self, x, y, source=PRIMARY_SCREEN):
+        """(b, g, r) at screen position (x, y)"""
+        frame, origin = self.get(source)
+        left, top = origin or (0, 0)
+        row, col = y - top, x - left
+        if not (0 <= row < frame.shape[0] and 0 <= col < frame.shape[1]):
+            raise ValueError(f'({x}, {y}) is off screen')
+        b, g, r = frame[row, col, :3]
+        return int(b), int(g), int(r)
+
+    def region(self, source):
+        """View of the cached frame for a source id, cropped to its region of interest"""
+        base, roi = parse_source_id(source)
+        view = crop_frame(self.get(base)[0], roi)
+        if view is None:
+            raise ValueError(f'Region {source} is outside the captured frame')
+        return view
+
+    def invalidate(self):
+        with self._lock:
+            self._frames.clear()
+
+
+frames = FrameCache()
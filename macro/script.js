@@ -10,9 +10,24 @@ let currentSpriteIndex = 0
 let CLICK_TO_RUN_ENABLED = true
 
 // Track which blocks need the agent (by category)
-const agentBlockCategories = new Set(['mouse', 'keyboard', 'web and apps', 'computer'])
+const agentBlockCategories = new Set(['mouse', 'keyboard', 'web and apps', 'computer', 'vision'])
 const blockCategoryMap = new Map() // Maps block type to category name
 
+// Block types the agent executes; replaced by the agent's own /blocks list once connected
+const fallbackAgentBlockTypes = new Set([
+  // Keyboard blocks
+  'press_key', 'press_key_for', 'type_string', 'press_key_with_modifier',
+  'hold_key_with_modifier', 'wait_for_key', 'wait_any_key', 'key_down', 'key_up',
+  // Mouse blocks
+  'move', 'glide', 'scroll_mouse', 'press_mouse', 'double_press_mouse', 'mouse_down', 'mouse_up',
+  // Vision blocks
+  'click_image', 'wait_for_image', 'image_on_screen', 'image_position', 'pixel_colour',
+  'pixel_is_colour', 'region_colour_percent', 'region_is_colour', 'region_average_colour',
+  // Only 'wait' control block needs agent (for sleep)
+  'wait'
+])
+let agentBlockTypes = null
+
 // Local Agent Connection
 const AGENT_URL = 'http://localhost:9001'
 let agentConnected = false
@@ -32,9 +47,14 @@ async function checkAgentConnection() {
     const data = await response.json()
     agentConnected = data.status === 'running'
     updateAgentStatus('connected')
+    if (agentConnected) {
+      openAgentChannel()
+      if (!agentBlockTypes) loadAgentBlockTypes()
+    }
   } catch (error) {
     agentConnected = false
     updateAgentStatus('disconnected')
+    closeAgentChannel()
   }
   
   isInitialLoad = false
@@ -99,6 +119,21 @@ function showAgentWarning() {
   }, 5000)
 }
 
+async function loadAgentBlockTypes() {
+  try {
+    const response = await fetch(`${AGENT_URL}/blocks`, { method: 'GET', mode: 'cors' })
+    const data = await response.json()
+    if (Array.isArray(data.types)) agentBlockTypes = new Set(data.types)
+  } catch (error) {
+    console.warn('Could not load agent block types', error)
+  }
+}
+
+// Check if the agent executes a block type (rather than the editor itself)
+function isAgentBlock(blockType) {
+  return (agentBlockTypes || fallbackAgentBlockTypes).has(blockType)
+}
+
 // Check if a block type requires the agent
 function blockNeedsAgent(blockType) {
   const category = blockCategoryMap.get(blockType)
@@ -115,19 +150,23 @@ async function executeOnAgent(blockType, params) {
   console.log('Sending to agent - Type:', blockType, 'Params:', params)
   
   try {
-    const response = await fetch(`${AGENT_URL}/execute`, {
-      method: 'POST',
-      headers: {
-        'Content-Type': 'application/json'
-      },
-      body: JSON.stringify({
-        type: blockType,
-        params: params,
-        id: Date.now()
+    let result
+    if (agentChannel && agentChannel.id) {
+      result = await channelSend({ type: blockType, params: params })
+    } else {
+      const response = await fetch(`${AGENT_URL}/execute`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json'
+        },
+        body: JSON.stringify({
+          type: blockType,
+          params: params,
+          id: Date.now()
+        })
       })
-    })
-    
-    const result = await response.json()
+      result = await response.json()
+    }
     
     // Debug console output
     console.log('Agent result:', result)
@@ -168,6 +207,120 @@ async function executeOnAgent(blockType, params) {
   }
 }
 
+// Persistent channel to the agent: commands are batched into one text/plain POST
+// (no CORS preflight) and their results come back over server-sent events
+let agentChannel = null
+
+async function openAgentChannel() {
+  if (agentChannel || typeof EventSource === 'undefined') return
+  const pending = { id: null, source: null, nextSeq: 1, waiting: new Map(), batch: [], jobWaiters: new Map(), finishedJobs: new Map() }
+  agentChannel = pending
+  try {
+    const response = await fetch(`${AGENT_URL}/channel`, { method: 'POST' })
+    const data = await response.json()
+    if (!data.success) throw new Error(data.error || 'Could not open channel')
+    pending.id = data.channel
+  } catch (error) {
+    if (agentChannel === pending) agentChannel = null
+    return
+  }
+  
+  const source = new EventSource(`${AGENT_URL}/channel/${pending.id}/events`)
+  pending.source = source
+  
+  source.addEventListener('result', e => {
+    const reply = JSON.parse(e.data)
+    const waiter = pending.waiting.get(reply.seq)
+    if (waiter) {
+      pending.waiting.delete(reply.seq)
+      waiter.resolve(reply)
+    }
+  })
+  
+  // Console output from agent-side jobs, as it happens
+  source.addEventListener('console', e => {
+    const out = JSON.parse(e.data)
+    if (out.action === 'console_output') addConsoleOutput(out.message, out.type)
+    else emitConsoleBlock(out.block, out.message, out)
+  })
+  
+  source.addEventListener('job', e => {
+    const job = JSON.parse(e.data)
+    if (job.state === 'queued' || job.state === 'running') return
+    const waiter = pending.jobWaiters.get(job.id)
+    if (waiter) {
+      pending.jobWaiters.delete(job.id)
+      waiter.resolve(job)
+    } else {
+      // Finished before anyone asked (fast jobs can beat their own 'result' reply)
+      pending.finishedJobs.set(job.id, job)
+      log(`${job.state === 'done' ? '✓' : '✗'} Agent job ${job.id} ${job.state}${job.error ? ': ' + job.error : ''}`)
+    }
+  })
+  
+  source.onerror = () => {
+    // EventSource retries on its own; CLOSED means the agent dropped the channel
+    if (source.readyState === EventSource.CLOSED && agentChannel === pending) closeAgentChannel()
+  }
+}
+
+function closeAgentChannel() {
+  const channel = agentChannel
+  if (!channel) return
+  agentChannel = null
+  if (channel.source) channel.source.close()
+  channel.waiting.forEach(waiter => waiter.reject(new Error('Agent channel closed')))
+  channel.waiting.clear()
+  channel.jobWaiters.forEach(waiter => waiter.reject(new Error('Agent channel closed')))
+  channel.jobWaiters.clear()
+  channel.finishedJobs.clear()
+  if (channel.id) fetch(`${AGENT_URL}/channel/${channel.id}`, { method: 'DELETE' }).catch(() => {})
+}
+
+// Queue a command on the channel; everything sent in the same tick goes out in one POST
+function channelSend(command) {
+  const channel = agentChannel
+  if (!channel || !channel.id) return Promise.reject(new Error('Agent channel not open'))
+  
+  const seq = channel.nextSeq++
+  const reply = new Promise((resolve, reject) => channel.waiting.set(seq, { resolve, reject }))
+  channel.batch.push({ ...command, seq })
+  if (channel.batch.length === 1) queueMicrotask(() => flushAgentChannel(channel))
+  return reply
+}
+
+// Resolve with a channel job's final state once it is done, failed or cancelled
+function channelJobFinished(channel, jobId) {
+  const finished = channel.finishedJobs.get(jobId)
+  if (finished) {
+    channel.finishedJobs.delete(jobId)
+    return Promise.resolve(finished)
+  }
+  return new Promise((resolve, reject) => channel.jobWaiters.set(jobId, { resolve, reject }))
+}
+
+function flushAgentChannel(channel) {
+  const batch = channel.batch
+  channel.batch = []
+  if (batch.length === 0) return
+  fetch(`${AGENT_URL}/channel/${channel.id}/commands`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'text/plain' },
+    body: JSON.stringify(batch)
+  }).then(response => {
+    if (!response.ok) throw new Error(`Channel rejected commands (${response.status})`)
+  }).catch(error => {
+    for (const command of batch) {
+      const waiter = channel.waiting.get(command.seq)
+      if (waiter) {
+        channel.waiting.delete(command.seq)
+        waiter.reject(error)
+      }
+    }
+    if (agentChannel === channel) closeAgentChannel()
+  })
+}
+
 // Start checking agent connection periodically
 function startAgentCheck() {
   checkAgentConnection()
@@ -179,6 +332,7 @@ window.addEventListener('beforeunload', () => {
   if (agentCheckInterval) {
     clearInterval(agentCheckInterval)
   }
+  closeAgentChannel()
 })
 
 // Load theme preference
@@ -630,6 +784,13 @@ async function evaluateValueBlock(block, runtime) {
     return variable ? variable.value : null
   }
   
+  // Value blocks the agent evaluates (mouse position, vision probes, ...)
+  if (isAgentBlock(block.type)) {
+    const fields = await collectFields(block, runtime)
+    const result = await executeOnAgent(block.type, fields)
+    return result.success ? result.result : null
+  }
+  
   // For other blocks, try to extract field value
   try {
     const fields = Object.keys(block.fields_ || {})
@@ -675,6 +836,33 @@ async function collectFields(blk, runtime){
   return out
 }
 
+// Write a console block's message to the macro console
+function emitConsoleBlock(blockType, message, fields = {}){
+  const colour = fields.colour || '⬜ white'
+  const iconText = fields.icon ? fields.icon.split(' ')[0] : ''
+  
+  switch(blockType){
+    case 'output':{
+      let type = fields.type || 'log'
+      // Handle emoji prefixes in dropdown values
+      if (type.includes('warning')) type = 'warning'
+      else if (type.includes('error')) type = 'error'
+      else type = 'log'
+      blockOutput(String(message), type)
+      return
+    }
+    case 'output_colour':
+      blockOutput(String(message), 'log', '', colour)
+      return
+    case 'output_icon':
+      blockOutput(String(message), 'log', iconText)
+      return
+    case 'output_colour_icon':
+      blockOutput(String(message), 'log', iconText, colour)
+      return
+  }
+}
+
 // Execute a single block instance
 async function executeSingleBlock(blk, runtime){
   if(!blk || !blk.type) return
@@ -841,56 +1029,19 @@ async function executeSingleBlock(blk, runtime){
         }
         return
       }
-      case 'output':{
-        // Get message value from input
-        const messageInput = blk.getInput('message')
-        const messageBlock = messageInput?.connection?.targetBlock()
-        const message = messageBlock ? await evaluateValueBlock(messageBlock, runtime) : ''
-        let type = blk.getFieldValue('type') || 'log'
-        
-        // Handle emoji prefixes in dropdown values
-        if (type.includes('warning')) type = 'warning'
-        else if (type.includes('error')) type = 'error'
-        else type = 'log'
-        
-        // Output to macro console with type
-        blockOutput(String(message), type)
-        return
-      }
-      case 'output_colour':{
-        // Get message value from input
-        const messageInput = blk.getInput('message')
-        const messageBlock = messageInput?.connection?.targetBlock()
-        const message = messageBlock ? await evaluateValueBlock(messageBlock, runtime) : ''
-        const colour = blk.getFieldValue('colour') || '⬜ white'
-        
-        // Output to macro console with color
-        blockOutput(String(message), 'log', '', colour)
-        return
-      }
-      case 'output_icon':{
-        // Get message value from input
-        const messageInput = blk.getInput('message')
-        const messageBlock = messageInput?.connection?.targetBlock()
-        const message = messageBlock ? await evaluateValueBlock(messageBlock, runtime) : ''
-        const icon = blk.getFieldValue('icon') || ''
-        
-        // Output to macro console with icon at start
-        const iconText = icon ? icon.split(' ')[0] : ''
-        blockOutput(String(message), 'log', iconText)
-        return
-      }
+      case 'output':
+      case 'output_colour':
+      case 'output_icon':
       case 'output_colour_icon':{
         // Get message value from input
         const messageInput = blk.getInput('message')
         const messageBlock = messageInput?.connection?.targetBlock()
         const message = messageBlock ? await evaluateValueBlock(messageBlock, runtime) : ''
-        const colour = blk.getFieldValue('colour') || '⬜ white'
-        const icon = blk.getFieldValue('icon') || ''
-        
-        // Output to macro console with icon at start and color
-        const iconText = icon ? icon.split(' ')[0] : ''
-        blockOutput(String(message), 'log', iconText, colour)
+        emitConsoleBlock(blk.type, message, {
+          type: blk.getField('type') ? blk.getFieldValue('type') : undefined,
+          colour: blk.getField('colour') ? blk.getFieldValue('colour') : undefined,
+          icon: blk.getField('icon') ? blk.getFieldValue('icon') : undefined
+        })
         return
       }
       default:
@@ -900,18 +1051,9 @@ async function executeSingleBlock(blk, runtime){
     // server-backed block
     const fields = await collectFields(blk, runtime)
     
-    // Check if this is a keyboard or mouse block that should use the agent
-    // (Control and console blocks are handled locally by JavaScript generators)
-    const agentBlockTypes = [
-                             // Keyboard blocks
-                             'press_key', 'press_key_for', 'type_string', 'press_key_with_modifier',
-                             'hold_key_with_modifier', 'wait_for_key', 'wait_any_key',
-                             // Mouse blocks
-                             'move', 'glide', 'scroll_mouse', 'press_mouse', 'double_press_mouse',
-                             // Only 'wait' control block needs agent (for sleep)
-                             'wait']
-    
-    if (agentBlockTypes.some(type => blk.type.includes(type) || blk.type === type)) {
+    // Check if this is a block the agent executes
+    // (Control and console blocks are handled locally above)
+    if (isAgentBlock(blk.type)) {
       log('Executing on agent: ' + blk.type + ' ' + JSON.stringify(fields))
       const result = await executeOnAgent(blk.type, fields)
       if (!result.success) {
@@ -1014,6 +1156,7 @@ function sleep(ms){ return new Promise(res => setTimeout(res, ms)); }
 async function runUserCode(func){
   running = true; stopped = false
   updateStartStopButton()
+  refreshDisplayStream()
   try{
     await func()
     log('Program finished')
@@ -1022,6 +1165,7 @@ async function runUserCode(func){
   }
   running = false
   updateStartStopButton()
+  refreshDisplayStream()
 }
 
 function stopAll(){ 
@@ -1029,6 +1173,10 @@ function stopAll(){
   running = false
   updateStartStopButton()
   log('Stopping...')
+  if(agentConnected){
+    if(agentProgramJob && agentChannel) channelSend({ cancel: agentProgramJob }).catch(() => {})
+    fetch(`${AGENT_URL}/run/stop`, { method: 'POST' }).catch(() => {})
+  }
 }
 
 function updateStartStopButton(){
@@ -1372,7 +1520,8 @@ async function loadBlocksFromJson(){
       'varible.json',
       'webapps.json',
       'console.json',
-      'computer.json'
+      'computer.json',
+      'vision.json'
     ]
     
     // Try to load all known files
@@ -1840,8 +1989,9 @@ function registerBlocksArray(arr, categoryColour = null, categoryName = null){
                           // Validate: only allow single character or special keys
                           if(newValue.length === 0) return null
                           if(newValue.length === 1) return newValue
-                          // Allow special keys like F1-F12, ctrl, shift, alt, etc.
-                          const validKeys = /^(F[1-9]|F1[0-2]|ctrl|shift|alt|tab|enter|space|esc|backspace|delete|home|end|pageup|pagedown|up|down|left|right|insert|capslock|numlock|scrolllock|pause|printscreen)$/i
+                          // Allow special keys like F1-F12, ctrl, shift, alt, etc. (and the
+                          // keyboard library's spellings, e.g. 'right shift', that recordings use)
+                          const validKeys = /^((left |right )?(ctrl|shift|alt|windows)|alt gr|F[1-9]|F1[0-2]|tab|enter|space|esc|backspace|delete|home|end|page ?up|page ?down|up|down|left|right|insert|caps ?lock|num ?lock|scroll ?lock|pause|print ?screen|menu)$/i
                           if(validKeys.test(newValue)) return newValue.toLowerCase()
                           // Otherwise return just the first character
                           return newValue.charAt(0)
@@ -1996,6 +2146,149 @@ function spriteAPI(s){
   }
 }
 
+/* Agent-side program runs */
+
+// Blocks that only exist in the browser (sprite stage); stacks using them run locally
+const CLIENT_ONLY_BLOCK_TYPES = new Set(['move_steps', 'turn_right', 'turn_left', 'set_xy', 'say', 'change_size', 'wait_seconds'])
+
+// Convert a value block into a literal or an expression node for the agent
+function serializeValueBlock(block){
+  if(!block) return null
+  if(block.type === 'math_number') return Number(block.getFieldValue('NUM') || 0)
+  if(block.type === 'text_field') return String(block.getFieldValue('TEXT') || '')
+  if(block.type === 'key_field') return String(block.getFieldValue('KEY') || '')
+  if(block.type === 'boolean') return block.getFieldValue('state') === 'True'
+  return serializeBlock(block)
+}
+
+// Convert one block (and any nested blocks) into a program node
+function serializeBlock(blk){
+  if(CLIENT_ONLY_BLOCK_TYPES.has(blk.type)){
+    throw new Error(`${blk.type} can only run in the browser`)
+  }
+  
+  const node = { type: blk.type, params: {} }
+  for(const inp of (blk.inputList || [])){
+    (inp.fieldRow || []).forEach(f => {
+      if(f && f.name) node.params[f.name] = blk.getFieldValue(f.name)
+    })
+    if(inp.type === Blockly.INPUT_VALUE && inp.name){
+      const target = inp.connection?.targetBlock()
+      if(target) node.params[inp.name] = serializeValueBlock(target)
+    }
+  }
+  
+  const substack = blk.getInputTargetBlock && blk.getInputTargetBlock('SUBSTACK')
+  if(substack) node.body = serializeStack(substack)
+  return node
+}
+
+function serializeStack(first){
+  const nodes = []
+  for(let cur = first; cur; cur = cur.getNextBlock()){
+    nodes.push(serializeBlock(cur))
+  }
+  return nodes
+}
+
+// Id of the program job runStackOnAgent is waiting on, so stopAll can cancel it
+let agentProgramJob = null
+
+// Run a program as a channel job; console output arrives on the channel while it runs
+async function runProgramJob(channel, program, initial){
+  const reply = await channelSend({ job: { program, variables: initial } })
+  if(!reply.success) throw new Error(reply.error || 'Agent run failed')
+  agentProgramJob = reply.job
+  try{
+    const job = await channelJobFinished(channel, reply.job)
+    if(job.state === 'failed') throw new Error(job.error || 'Agent run failed')
+    if(job.state === 'cancelled' && !job.result) return null
+    return job.result
+  }finally{
+    agentProgramJob = null
+  }
+}
+
+// Run a whole start stack on the agent: as a job on the channel when one is
+// open, so output shows up as it happens, otherwise in one /run request
+async function runStackOnAgent(program){
+  const initial = {}
+  variables.forEach(v => { initial[v.name] = v.value })
+  
+  let result
+  const channel = agentChannel
+  if(channel && channel.id){
+    result = await runProgramJob(channel, program, initial)
+    if(!result){
+      log('✗ Agent program cancelled')
+      return
+    }
+  }else{
+    const response = await fetch(`${AGENT_URL}/run`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ program, variables: initial })
+    })
+    result = await response.json()
+    if(!result.success) throw new Error(result.error || 'Agent run failed')
+    for(const out of (result.outputs || [])) emitConsoleBlock(out.block, out.message, out)
+  }
+  
+  for(const err of (result.errors || [])) log('✗ ' + err)
+  
+  // Copy final variable values back into the editor
+  let changed = false
+  variables.forEach(v => {
+    if(v.name in result.variables && result.variables[v.name] !== v.value){
+      v.value = result.variables[v.name]
+      changed = true
+    }
+  })
+  if(changed){
+    saveVariables()
+    renderVariablesTable()
+  }
+  log(`✓ Agent ran ${result.steps} blocks in ${(result.elapsed * 1000).toFixed(1)} ms${result.stopped ? ' (stopped)' : ''}`)
+}
+
+/* Macro recorder */
+
+let recordingOnAgent = false
+
+// Start recording on the agent, or stop and drop the recording into the workspace as blocks
+async function toggleRecording(){
+  if(!agentConnected){
+    showAgentWarning()
+    return
+  }
+  const btn = document.getElementById('recordToggle')
+  try{
+    if(!recordingOnAgent){
+      const response = await fetch(`${AGENT_URL}/record/start`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ stop_key: 'esc' })
+      })
+      const result = await response.json()
+      if(!result.success) throw new Error(result.error || 'Could not start recording')
+      recordingOnAgent = true
+      if(btn) btn.innerText = '⏹ Stop recording'
+      log('⏺ Recording keyboard and mouse (press Esc or Stop recording to finish)')
+      return
+    }
+
+    const response = await fetch(`${AGENT_URL}/record/stop`, { method: 'POST' })
+    const result = await response.json()
+    recordingOnAgent = false
+    if(btn) btn.innerText = '⏺ Record'
+    if(!result.success) throw new Error(result.error || 'Could not stop recording')
+    Blockly.Xml.domToWorkspace(Blockly.Xml.textToDom(result.xml), workspace)
+    log(`✓ Recorded ${result.events} events over ${result.duration}s as ${result.blocks} blocks`)
+  }catch(e){
+    log('✗ Recorder: ' + e.message)
+  }
+}
+
 /* Run all start blocks */
 async function runAllStarts(){
   if(running) return log('Program already running')
@@ -2025,6 +2318,17 @@ async function runAllStarts(){
         let next = st.getNextBlock()
         if(!next){ log('Start block has no child blocks'); continue }
         
+        // Prefer running the whole stack on the agent in one round-trip
+        if(agentConnected){
+          let program = null
+          try{ program = serializeStack(next) }catch(e){ log('Running in browser: ' + e.message) }
+          if(program){
+            await runStackOnAgent(program)
+            if(stopped) break
+            continue
+          }
+        }
+        
         while(next){
           await executeSingleBlock(next, runtime)
           if(stopped) break
@@ -2422,6 +2726,23 @@ function setupSettingsModal() {
 /* Display source selector using agent */
 let currentStream = null
 
+// Stream settings for the preview pane; drop to a cheap 10 FPS feed while a macro runs
+const DISPLAY_STREAM_IDLE = { fps: 30, quality: 85 }
+const DISPLAY_STREAM_RUNNING = { fps: 10, quality: 60, resample: 'bilinear' }
+
+function displayStreamUrl() {
+  const settings = running ? DISPLAY_STREAM_RUNNING : DISPLAY_STREAM_IDLE
+  const query = new URLSearchParams({ ...settings, t: Date.now() })
+  return `${AGENT_URL}/display/stream?${query}`
+}
+
+// Reconnect the preview with settings matching the current run state
+function refreshDisplayStream() {
+  const img = document.getElementById('displayImage')
+  if (!img || !currentStream) return
+  img.src = displayStreamUrl()
+}
+
 async function setupDisplaySelector() {
   const selector = document.getElementById('displaySource')
   const img = document.getElementById('displayImage')
@@ -2431,7 +2752,7 @@ async function setupDisplaySelector() {
   if (!selector || !img) return
   
   // Function to populate all available sources from agent
-  async function populateSources() {
+  async function populateSources(refresh = false) {
     const screenGroup = document.getElementById('screenGroup')
     const appGroup = document.getElementById('appGroup')
     const cameraGroup = document.getElementById('cameraGroup')
@@ -2445,7 +2766,7 @@ async function setupDisplaySelector() {
     
     try {
       // Get sources from agent
-      const response = await fetch('http://localhost:9001/display/sources')
+      const response = await fetch(`${AGENT_URL}/display/sources${refresh ? '?refresh=1' : ''}`)
       if (!response.ok) {
         log('⚠️ Agent not connected - cannot get display sources')
         return
@@ -2477,7 +2798,8 @@ async function setupDisplaySelector() {
         cameraGroup.appendChild(option)
       })
       
-      log(`✓ Found ${sources.screens?.length || 0} screens, ${sources.windows?.length || 0} windows, ${sources.cameras?.length || 0} cameras`)
+      const age = sources.age != null ? ` (updated ${Math.round(sources.age)}s ago)` : ''
+      log(`✓ Found ${sources.screens?.length || 0} screens, ${sources.windows?.length || 0} windows, ${sources.cameras?.length || 0} cameras${age}`)
     } catch (err) {
       console.error('Error getting display sources:', err)
       log('❌ Failed to get display sources from agent')
@@ -2491,7 +2813,7 @@ async function setupDisplaySelector() {
   if (refreshBtn) {
     refreshBtn.addEventListener('click', async () => {
       log('Refreshing sources...')
-      await populateSources()
+      await populateSources(true)
     })
   }
   
@@ -2501,6 +2823,7 @@ async function setupDisplaySelector() {
     
     if (!value) {
       // Clear display
+      currentStream = null
       img.src = ''
       img.style.display = 'none'
       if (noSourceMsg) noSourceMsg.style.display = 'block'
@@ -2521,7 +2844,8 @@ async function setupDisplaySelector() {
       }
       
       // Start streaming from agent
-      img.src = 'http://localhost:9001/display/stream?' + new Date().getTime()
+      currentStream = value
+      img.src = displayStreamUrl()
       img.style.display = 'block'
       if (noSourceMsg) noSourceMsg.style.display = 'none'
       
@@ -2605,6 +2929,9 @@ async function boot(){
     updateToggleStyle()
   }
   
+  const recordToggle = document.getElementById('recordToggle')
+  if(recordToggle) recordToggle.onclick = toggleRecording
+  
   // Apply saved theme
   applyTheme(isDarkMode)
   
@@ -0,0 +1,68 @@
+"""Tests for the /run program interpreter, against stand-in block functions"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from interpreter import Interpreter, ProgramCompiler
+
+
+def image_on_screen(params):
+    raise FileNotFoundError(params['image'])
+
+
+def pixel_is_colour(params):
+    return 'Error: pixel (-5, -5) is off screen'
+
+
+def output(params):
+    return {'action': 'console_output', 'message': params['message'], 'type': 'log'}
+
+
+BLOCKS = {'image_on_screen': image_on_screen, 'pixel_is_colour': pixel_is_colour, 'say': output}
+
+
+def resolve(block_type):
+    func = BLOCKS.get(block_type)
+    return (func, None) if func else (None, f'Unknown block type: {block_type}')
+
+
+def run(program):
+    return Interpreter(ProgramCompiler(resolve)).run(program)
+
+
+def if_block(condition):
+    return {'type': 'if', 'params': {'condition': condition},
+            'body': [{'type': 'say', 'params': {'message': 'FOUND'}}]}
+
+
+def test_raising_condition_skips_body_and_reports_error():
+    result = run([if_block({'type': 'image_on_screen', 'params': {'image': '/nonexistent.png'}})])
+    assert result['outputs'] == []
+    assert result['errors'] == ['Error executing image_on_screen: /nonexistent.png']
+
+
+def test_error_string_condition_skips_body_and_reports_error():
+    result = run([if_block({'type': 'pixel_is_colour', 'params': {'X': -5, 'Y': -5}})])
+    assert result['outputs'] == []
+    assert result['errors'] == ['Error: pixel (-5, -5) is off screen']
+
+
+def test_unknown_value_block_is_false_and_reported():
+    result = run([if_block({'type': 'no_such_block', 'params': {}})])
+    assert result['outputs'] == []
+    assert result['errors'] == ['Unknown block type: no_such_block']
+
+
+def test_failed_while_condition_ends_the_loop():
+    result = run([{'type': 'while', 'params': {'condition': {'type': 'image_on_screen', 'params': {'image': 'x.png'}}},
+                   'body': [{'type': 'say', 'params': {'message': 'looping'}}]}])
+    assert result['outputs'] == []
+    assert len(result['errors']) == 1
+
+
+def test_true_condition_still_runs_body():
+    result = run([if_block({'type': '=_!=', 'params': {'value1': 1, 'value2': '1'}})])
+    assert [o['message'] for o in result['outputs']] == ['FOUND']
+    assert result['errors'] == []
@@ -0,0 +1,94 @@
+"""
+Build step: write .gz (and .br, with the brotli package) siblings for the site's text assets
+Usage: python precompress.py [--clean]
+
+server.py serves script.js.br / script.js.gz in place of script.js when the
+browser accepts that encoding, so compression costs nothing at request
+time. Siblings are only rewritten when the source file is newer, and are
+skipped when they would not be smaller. Run it again after editing assets
+(the server ignores siblings older than their source in the meantime).
+"""
+
+import argparse
+import mimetypes
+import os
+import sys
+
+from server import DIRECTORY, ENCODING_SUFFIXES, can_compress, compress, is_compressible
+
+SKIP_DIRS = {'.git', '__pycache__', 'node_modules', 'dist', 'build', '.venv', 'venv'}
+# Only what browsers fetch; scripts like server.py itself are left alone
+ASSET_EXTENSIONS = ('.html', '.css', '.js', '.mjs', '.json', '.svg', '.xml', '.txt', '.md')
+
+
+def site_files():
+    for root, dirs, files in os.walk(DIRECTORY):
+        dirs[:] = [d for d in dirs if d not in SKIP_DIRS and not d.startswith('.')]
+        for name in files:
+            yield os.path.join(root, name)
+
+
+def precompress():
+    encodings = [e for e in ENCODING_SUFFIXES if can_compress(e)]
+    if 'br' not in encodings:
+        print("⚠️  brotli not installed (pip install brotli), writing .gz only")
+
+    written = skipped = 0
+    original_total = compressed_total = 0
+    for path in site_files():
+        if not path.endswith(ASSET_EXTENSIONS):
+            continue
+        content_type = mimetypes.guess_type(path)[0] or ''
+        stat = os.stat(path)
+        if not is_compressible(content_type, stat.st_size):
+            continue
+
+        data = None
+        for encoding in encodings:
+            target = path + ENCODING_SUFFIXES[encoding]
+            if os.path.exists(target) and os.stat(target).st_mtime_ns >= stat.st_mtime_ns:
+                skipped += 1
+                continue
+            if data is None:
+                with open(path, 'rb') as f:
+                    data = f.read()
+            body = compress(data, encoding, best=True)
+            if len(body) >= len(data):
+                continue
+            with open(target, 'wb') as f:
+                f.write(body)
+            written += 1
+            original_total += len(data)
+            compressed_total += len(body)
+            print(f"  {os.path.relpath(target, DIRECTORY):<60} {len(data) / 1024:8.1f} KB -> {len(body) / 1024:7.1f} KB")
+
+    print(f"\n✓ Wrote {written} files ({skipped} already up to date)")
+    if original_total:
+        print(f"  {original_total / 1024:.1f} KB -> {compressed_total / 1024:.1f} KB "
+              f"({original_total / compressed_total:.1f}x smaller)")
+
+
+def clean():
+    removed = 0
+    for path in site_files():
+        base, ext = os.path.splitext(path)
+        if ext in ENCODING_SUFFIXES.values() and os.path.isfile(base):
+            os.remove(path)
+            removed += 1
+    print(f"✓ Removed {removed} precompressed files")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clean', action='store_true', help='remove the .gz/.br siblings instead')
+    args = parser.parse_args()
+
+    if args.clean:
+        clean()
+    else:
+        precompress()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
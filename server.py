@@ -1,76 +1,885 @@
+import argparse
+import bisect
+import email.utils
+import gzip
+import hashlib
 import http.server
+import io
+import json
+import re
 import socketserver
+import threading
+import time
+import urllib.parse
 import webbrowser
 import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
 from pathlib import Path
 
+try:
+    import brotli
+except ImportError:
+    # Optional: `pip install brotli` adds Content-Encoding: br; gzip works without it
+    brotli = None
+
 # Configuration
 PORT = int(os.environ.get('PORT', '8000'))
+# Worker threads serving connections; a page load opens several at once
+WORKERS = int(os.environ.get('WORKERS', '16'))
+# Seconds an idle keep-alive connection may hold on to its worker
+KEEPALIVE_TIMEOUT = 5
 # Serve from the project root so both `basic/` and `games/` are accessible
 DIRECTORY = Path(__file__).parent
+# Game launcher catalogue: one folder with a data.json per game
+GAMES_DIR = DIRECTORY / 'game-launcher' / 'games'
+GAMES_API_PATH = '/api/games'
+
+# --prod caching: fingerprinted assets (app.3f9c2a1b.js, or ?v= set to the start of the
+# file's content hash) never change, everything else is revalidated against its ETag on each use
+FINGERPRINT_RE = re.compile(r'\.[0-9a-f]{8,}\.\w+$')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+# In-memory file cache: total bytes held, and the largest file worth holding
+CACHE_BUDGET = 64 * 1024 * 1024
+CACHE_MAX_FILE_SIZE = 1024 * 1024
+
+# Compression: text-like types over COMPRESS_MIN_SIZE bytes, in order of preference.
+# Precompressed siblings (script.js.br, script.js.gz from precompress.py) are used when present.
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'application/xml', 'image/svg+xml')
+COMPRESS_MIN_SIZE = 512
+ENCODING_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+
+def is_compressible(content_type, size):
+    return size >= COMPRESS_MIN_SIZE and content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def can_compress(encoding):
+    return encoding == 'gzip' or (encoding == 'br' and brotli is not None)
+
+
+def compress(data, encoding, best=False):
+    """gzip or brotli bytes; best trades time for size, for the one-off build step"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=11 if best else 5)
+    return gzip.compress(data, compresslevel=9 if best else 6, mtime=0)
+
+
+def negotiate_encoding(accept_encoding, offered):
+    """The first of offered that Accept-Encoding allows, or None for identity"""
+    accepted = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        q = 1.0
+        if params.strip().startswith('q='):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    for encoding in offered:
+        if accepted.get(encoding, accepted.get('*', 0)) > 0:
+            return encoding
+    return None
+
+
+# Range requests: one "bytes=first-last" range per request
+RANGE_RE = re.compile(r'bytes=(\d*)-(\d*)')
+UNSATISFIABLE = object()
+# Bodies this big are handed to sendfile() instead of being copied through Python
+SENDFILE_MIN_SIZE = 64 * 1024
+
+# Files up to this size get a content-hash ETag; bigger ones (media) one from inode, size and mtime
+ETAG_HASH_MAX_SIZE = 8 * 1024 * 1024
+# path -> (mtime_ns, size, ETag), so unchanged files are only hashed once; least recently used go first
+ETAG_CACHE_SIZE = 1024
+_etags = OrderedDict()
+_etags_lock = threading.Lock()
+
+
+def file_etag(path, stat):
+    """Strong ETag: the content hash, or inode-size-mtime for files over ETAG_HASH_MAX_SIZE"""
+    if stat.st_size > ETAG_HASH_MAX_SIZE:
+        return f'"{stat.st_ino:x}-{stat.st_size:x}-{stat.st_mtime_ns:x}"'
+    with _etags_lock:
+        cached = _etags.get(path)
+        if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            _etags.move_to_end(path)
+            return cached[2]
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    etag = f'"{digest.hexdigest()}"'
+    with _etags_lock:
+        _etags[path] = (stat.st_mtime_ns, stat.st_size, etag)
+        _etags.move_to_end(path)
+        while len(_etags) > ETAG_CACHE_SIZE:
+            _etags.popitem(last=False)
+    return etag
+
+
+def is_fingerprinted(url_path, etag):
+    """Whether url_path names this exact content: a hashed file name, or ?v= matching the ETag's hash"""
+    parts = urllib.parse.urlsplit(url_path)
+    if FINGERPRINT_RE.search(parts.path):
+        return True
+    versions = urllib.parse.parse_qs(parts.query).get('v', [])
+    digest = etag.strip('"') if etag else ''
+    return any(len(v) >= 8 and digest.startswith(v.lower()) for v in versions)
+
+def game_record(game_id, data):
+    """The launcher's view of one game's data.json"""
+    categories = data.get('categories') or data.get('catagories') or {}
+    if isinstance(categories, dict):
+        categories = [name for name, enabled in categories.items() if enabled is True]
+    return {
+        'id': game_id,
+        'name': data.get('name') or game_id,
+        'description': data.get('description', ''),
+        'thumbnail': data.get('thumbnail', ''),
+        'url': f'games/{urllib.parse.quote(game_id)}/index.html',
+        'categories': list(categories),
+        'version': data.get('version'),
+        'developer': data.get('developer'),
+        'release_date': data.get('release_date'),
+        'state': data.get('state') or data.get('status') or data.get('release_state'),
+    }
+
+
+def game_data_files(games_dir=GAMES_DIR):
+    """(game id, data.json path, stat) for every game folder, sorted by id"""
+    files = []
+    try:
+        entries = sorted(os.scandir(games_dir), key=lambda e: e.name)
+    except FileNotFoundError:
+        return files
+    for entry in entries:
+        if not entry.is_dir():
+            continue
+        path = os.path.join(entry.path, 'data.json')
+        try:
+            files.append((entry.name, path, os.stat(path)))
+        except FileNotFoundError:
+            pass
+    return files
+
+
+def load_game(game_id, path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return game_record(game_id, json.load(f))
+    except (OSError, ValueError) as e:
+        print(f"⚠️  Skipping {game_id}: {e}")
+        return None
+
+
+def scan_games(games_dir=GAMES_DIR):
+    """Every game's record, the same list /api/games serves"""
+    games = (load_game(game_id, path) for game_id, path, _ in game_data_files(games_dir))
+    return [game for game in games if game is not None]
+
+
+def search_tokens(text):
+    """Lower-cased words; game-launcher.js searches its static fallback the same way"""
+    return re.findall(r'\w+', text.lower())
+
+
+def game_tokens(game):
+    """Words a text search can find a game by"""
+    text = ' '.join(str(game.get(field) or '') for field in ('id', 'name', 'description', 'developer'))
+    return set(search_tokens(text + ' ' + ' '.join(game['categories'])))
+
+
+def release_date_key(game):
+    """Sortable (year, month, day) from the dd/mm/yyyy dates in data.json (ISO works too)"""
+    value = str(game.get('release_date') or '')
+    for fmt in ('%d/%m/%Y', '%Y-%m-%d'):
+        try:
+            date = time.strptime(value, fmt)
+            return date.tm_year, date.tm_mon, date.tm_mday
+        except ValueError:
+            pass
+    return 0, 0, 0
+
+
+GAME_SORT_KEYS = {
+    'name': lambda g: (str(g['name']).lower(), g['id']),
+    'id': lambda g: g['id'],
+    'release_date': lambda g: (release_date_key(g), g['id']),
+    'developer': lambda g: (str(g.get('developer') or '').lower(), g['id']),
+    'state': lambda g: (str(g.get('state') or '').lower(), g['id']),
+}
+GAMES_PER_PAGE = 50
+GAMES_MAX_PER_PAGE = 200
+# Any of these switches /api/games to a filtered page; other parameters (cache-busters) are ignored
+GAMES_QUERY_PARAMS = ('category', 'state', 'q', 'sort', 'page', 'per_page')
+
+
+class GamesIndex:
+    """The /api/games catalogue, kept in sync with the data.json files.
+    
+    Freshness costs one scandir and a stat per game, at most once per
+    check_interval. Only games whose data.json changed are re-read, and
+    their entries in the category, state and search-token indexes are
+    swapped in place, so queries never scan the whole catalogue.
+    """
+    
+    def __init__(self, games_dir=GAMES_DIR, check_interval=1.0):
+        self.games_dir = games_dir
+        self.check_interval = check_interval
+        self.records = {}
+        self.by_category = {}
+        self.by_state = {}
+        self.by_token = {}
+        self.body = b'[]'
+        self.etag = f'"{hashlib.sha1(self.body).hexdigest()}"'
+        self.mtime = 0
+        self.encoded = {}
+        self._signatures = {}
+        self._sorted_tokens = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+    
+    def refresh(self):
+        """Pick up added, changed and removed games if due; returns self for chaining"""
+        with self._lock:
+            now = time.monotonic()
+            if self._checked_at is not None and now - self._checked_at < self.check_interval:
+                return self
+            self._checked_at = now
+            
+            files = {game_id: (path, stat) for game_id, path, stat in game_data_files(self.games_dir)}
+            changed = False
+            for game_id in set(self._signatures) - set(files):
+                del self._signatures[game_id]
+                self._remove(game_id)
+                changed = True
+            for game_id, (path, stat) in files.items():
+                signature = (stat.st_mtime_ns, stat.st_size)
+                if self._signatures.get(game_id) == signature:
+                    continue
+                self._signatures[game_id] = signature
+                self._remove(game_id)
+                game = load_game(game_id, path)
+                if game is not None:
+                    self._add(game)
+                changed = True
+            
+            if changed:
+                self.mtime = max((stat.st_mtime for _, stat in files.values()), default=0)
+                self._publish()
+            return self
+    
+    def _postings(self, game):
+        yield self.by_category, {str(c).lower().strip() for c in game['categories']}
+        yield self.by_state, {str(game['state']).lower()} if game.get('state') else set()
+        yield self.by_token, game_tokens(game)
+    
+    def _add(self, game):
+        self.records[game['id']] = game
+        for index, keys in self._postings(game):
+            for key in keys:
+                index.setdefault(key, set()).add(game['id'])
+        self._sorted_tokens = None
+    
+    def _remove(self, game_id):
+        game = self.records.pop(game_id, None)
+        if game is None:
+            return
+        for index, keys in self._postings(game):
+            for key in keys:
+                ids = index.get(key)
+                if ids is not None:
+                    ids.discard(game_id)
+                    if not ids:
+                        del index[key]
+        self._sorted_tokens = None
+    
+    def _publish(self):
+        games = [self.records[game_id] for game_id in sorted(self.records)]
+        self.body = json.dumps(games, indent=2).encode('utf-8')
+        self.etag = f'"{hashlib.sha1(self.body).hexdigest()}"'
+        self.encoded = {}
+    
+    def _token_matches(self, prefix):
+        """Ids of games with a search token starting with prefix"""
+        if self._sorted_tokens is None:
+            self._sorted_tokens = sorted(self.by_token)
+        tokens = self._sorted_tokens
+        ids = set()
+        for i in range(bisect.bisect_left(tokens, prefix), len(tokens)):
+            if not tokens[i].startswith(prefix):
+                break
+            ids |= self.by_token[tokens[i]]
+        return ids
+    
+    def query(self, categories=(), states=(), text='', sort='name', descending=False, page=1, per_page=GAMES_PER_PAGE):
+        """One page of the games matching every category, any of states, and every word of text"""
+        with self._lock:
+            matches = None
+            
+            def narrow(ids):
+                return set(ids) if matches is None else matches & ids
+            
+            for category in categories:
+                matches = narrow(self.by_category.get(category.lower().strip(), set()))
+            if states:
+                matches = narrow(set().union(*(self.by_state.get(state.lower(), set()) for state in states)))
+            for word in search_tokens(text):
+                matches = narrow(self._token_matches(word))
+            if matches is None:
+                matches = set(self.records)
+            
+            games = sorted((self.records[game_id] for game_id in matches),
+                           key=GAME_SORT_KEYS[sort], reverse=descending)
+            start = (page - 1) * per_page
+            return {
+                'games': games[start:start + per_page],
+                'total': len(games),
+                'page': page,
+                'per_page': per_page,
+                'pages': (len(games) + per_page - 1) // per_page,
+                'categories': {category: len(ids) for category, ids in sorted(self.by_category.items())},
+                'states': {state: len(ids) for state, ids in sorted(self.by_state.items())},
+            }
+    
+    def variant(self, encoding):
+        if encoding is None:
+            return self.body
+        body = self.encoded.get(encoding)
+        if body is None:
+            body = self.encoded[encoding] = compress(self.body, encoding)
+        return body
+
+
+class FileRange:
+    """A slice of an open file still to be sent; closing it closes the file"""
+    
+    def __init__(self, file, offset, length):
+        self.file = file
+        self.offset = offset
+        self.length = length
+    
+    def close(self):
+        self.file.close()
+
+
+class CachedFile:
+    """A file's bytes and response headers, or a marker that the file doesn't exist"""
+    
+    __slots__ = ('key', 'path', 'data', 'content_type', 'size', 'mtime', 'mtime_ns', 'etag', 'checked_at',
+                 'compressible', 'encoded')
+    
+    def __init__(self, key, path, data, content_type, stat, checked_at):
+        self.key = key
+        self.path = path
+        self.data = data
+        self.content_type = content_type
+        self.size = stat.st_size if stat else 0
+        self.mtime = stat.st_mtime if stat else 0
+        self.mtime_ns = stat.st_mtime_ns if stat else None
+        self.etag = f'"{hashlib.sha1(data).hexdigest()}"' if data is not None else None
+        self.checked_at = checked_at
+        self.compressible = data is not None and is_compressible(content_type, self.size)
+        # encoding -> compressed bytes, filled from precompressed siblings or on first request
+        self.encoded = {}
+    
+    @property
+    def footprint(self):
+        return self.size + sum(len(body) for body in self.encoded.values())
+    
+    def offered_encodings(self):
+        if not self.compressible:
+            return ()
+        return tuple(e for e in ENCODING_SUFFIXES if e in self.encoded or can_compress(e))
+    
+    def variant_etag(self, encoding):
+        return self.etag if encoding is None else f'{self.etag[:-1]}-{encoding}"'
+    
+    @property
+    def missing(self):
+        return self.mtime_ns is None
+
+
+class FileCache:
+    """LRU cache of small files held in memory, bounded by a byte budget.
+    
+    Entries are keyed by the translated request path. An entry is trusted
+    for check_interval seconds, then re-validated with one stat() against
+    its mtime and size; changed or deleted files are dropped and reloaded.
+    """
+    
+    def __init__(self, budget=CACHE_BUDGET, max_file_size=CACHE_MAX_FILE_SIZE, check_interval=1.0):
+        self.budget = budget
+        self.max_file_size = max_file_size
+        self.check_interval = check_interval
+        self.used = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def lookup(self, key):
+        """The cached entry for key if it is still current, else None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+        
+        now = time.monotonic()
+        if now - entry.checked_at < self.check_interval:
+            return entry
+        try:
+            stat = os.stat(entry.path)
+            current = not entry.missing and stat.st_mtime_ns == entry.mtime_ns and stat.st_size == entry.size
+        except OSError:
+            current = entry.missing
+        if not current:
+            self._remove(key, entry)
+            return None
+        entry.checked_at = now
+        return entry
+    
+    def load(self, key, path, content_type):
+        """Read path into the cache under key; None if it is too big to cache"""
+        try:
+            with open(path, 'rb') as f:
+                stat = os.fstat(f.fileno())
+                if stat.st_size > self.max_file_size:
+                    return None
+                data = f.read()
+        except FileNotFoundError:
+            data, stat = None, None
+        entry = CachedFile(key, path, data, content_type, stat, time.monotonic())
+        if entry.compressible:
+            self._load_precompressed(entry)
+        
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.used -= previous.footprint
+            self._entries[key] = entry
+            self.used += entry.footprint
+            self._evict()
+        return entry
+    
+    def _load_precompressed(self, entry):
+        # Siblings older than the file itself are stale leftovers from an earlier build
+        for encoding, suffix in ENCODING_SUFFIXES.items():
+            try:
+                with open(entry.path + suffix, 'rb') as f:
+                    if os.fstat(f.fileno()).st_mtime_ns >= entry.mtime_ns:
+                        entry.encoded[encoding] = f.read()
+            except OSError:
+                pass
+    
+    def variant(self, entry, encoding):
+        """entry's body in the given encoding (None for identity), compressing and caching it on first use"""
+        if encoding is None:
+            return entry.data
+        body = entry.encoded.get(encoding)
+        if body is None:
+            body = compress(entry.data, encoding)
+            with self._lock:
+                if encoding not in entry.encoded:
+                    entry.encoded[encoding] = body
+                    if self._entries.get(entry.key) is entry:
+                        self.used += len(body)
+                        self._evict()
+        return body
+    
+    def _evict(self):
+        while self.used > self.budget and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self.used -= evicted.footprint
+    
+    def _remove(self, key, entry):
+        with self._lock:
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+                self.used -= entry.footprint
+
 
 class MyHTTPRequestHandler(http.server.SimpleHTTPRequestHandler):
+    # Keep connections open between requests instead of one TCP connection per asset
+    protocol_version = 'HTTP/1.1'
+    timeout = KEEPALIVE_TIMEOUT
+    # Headers and body go out in separate writes; without this, reused connections stall on delayed ACKs
+    disable_nagle_algorithm = True
+    
+    # Set by --prod: validators and browser caching instead of no-store
+    production = False
+    # Shared FileCache of small files, set in main(); None reads from disk every time
+    file_cache = None
+    # GamesIndex behind /api/games, set in main(); None leaves the API out, like GitHub Pages
+    games_index = None
     
     def __init__(self, *args, **kwargs):
+        self.cache_control = None
         super().__init__(*args, directory=str(DIRECTORY), **kwargs)
     
     def end_headers(self):
-        # Add headers to prevent caching during development
-        self.send_header('Cache-Control', 'no-store, no-cache, must-revalidate')
-        self.send_header('Expires', '0')
+        if self.production:
+            self.send_header('Cache-Control', self.cache_control or REVALIDATE_CACHE_CONTROL)
+            self.cache_control = None
+        else:
+            # Add headers to prevent caching during development
+            self.send_header('Cache-Control', 'no-store, no-cache, must-revalidate')
+            self.send_header('Expires', '0')
         super().end_headers()
+    
+    def resolve_file(self):
+        """Filesystem path of the requested file, or None to leave the request to the default handling"""
+        path = self.translate_path(self.path)
+        if os.path.isdir(path):
+            if not urllib.parse.urlsplit(self.path).path.endswith('/'):
+                return None
+            path = os.path.join(path, 'index.html')
+        if path.endswith('/') or not os.path.isfile(path):
+            return None
+        return path
+    
+    def not_modified(self, etag, mtime):
+        """Whether the request's validators match the current file"""
+        if_none_match = self.headers.get('If-None-Match')
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(',')]
+            return '*' in tags or etag in tags
+        if_modified_since = self.headers.get('If-Modified-Since')
+        if if_modified_since:
+            try:
+                since = email.utils.parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError, IndexError, OverflowError):
+                return False
+            return since is not None and int(mtime) <= since.timestamp()
+        return False
+    
+    def requested_range(self, etag, size):
+        """(start, end) of a satisfiable single-range request, UNSATISFIABLE, or None for the whole file.
+        
+        Multi-range requests and stale If-Range validators get the whole file, as RFC 9110 allows.
+        """
+        header = self.headers.get('Range')
+        if not header:
+            return None
+        if_range = self.headers.get('If-Range')
+        if if_range is not None and if_range.strip() != etag:
+            return None
+        match = RANGE_RE.fullmatch(header.strip())
+        if not match:
+            return None
+        first, last = match.groups()
+        if not first:
+            if not last or int(last) == 0:
+                return UNSATISFIABLE
+            return max(0, size - int(last)), size - 1
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if start >= size:
+            return UNSATISFIABLE
+        if end < start:
+            return None
+        return start, end
+    
+    def send_file_headers(self, content_type, size, mtime, etag, encoding=None, vary=False, byte_range=None,
+                          static=True):
+        """Send a 200/206, or a 304/416 when there is no body to follow; returns whether the body should follow.
+        
+        Only static files (not generated responses) can be marked immutable or advertise ranges.
+        """
+        fingerprinted = static and is_fingerprinted(self.path, etag)
+        self.cache_control = IMMUTABLE_CACHE_CONTROL if fingerprinted else REVALIDATE_CACHE_CONTROL
+        # Development always sends the body, like the old no-cache server
+        if self.production and self.not_modified(etag, mtime):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header('ETag', etag)
+            if vary:
+                self.send_header('Vary', 'Accept-Encoding')
+            self.end_headers()
+            return False
+        
+        if byte_range is UNSATISFIABLE:
+            self.send_response(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE)
+            self.send_header('Content-Range', f'bytes */{size}')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return False
+        
+        if byte_range:
+            start, end = byte_range
+            self.send_response(HTTPStatus.PARTIAL_CONTENT)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{size}')
+            self.send_header('Content-Length', str(end - start + 1))
+        else:
+            self.send_response(HTTPStatus.OK)
+            self.send_header('Content-Length', str(size))
+        self.send_header('Content-Type', content_type)
+        self.send_header('Last-Modified', self.date_time_string(mtime))
+        self.send_header('ETag', etag)
+        if encoding:
+            self.send_header('Content-Encoding', encoding)
+        elif static:
+            # Only file responses honour Range
+            self.send_header('Accept-Ranges', 'bytes')
+        if vary:
+            self.send_header('Vary', 'Accept-Encoding')
+        self.end_headers()
+        return True
+    
+    def send_head(self):
+        # Hot files are answered from memory without touching the filesystem
+        key = self.translate_path(self.path)
+        entry = self.file_cache.lookup(key) if self.file_cache else None
+        if entry is None or entry.missing:
+            path = self.resolve_file()
+            if path is None:
+                # Redirects, directory listings and 404s
+                return super().send_head()
+            if self.file_cache:
+                entry = self.file_cache.load(key, path, self.guess_type(path))
+        
+        if entry is not None and not entry.missing:
+            byte_range = self.requested_range(entry.etag, entry.size)
+            # Ranges address the identity bytes, so they are never compressed
+            encoding = None if byte_range else negotiate_encoding(
+                self.headers.get('Accept-Encoding', ''), entry.offered_encodings())
+            body = self.file_cache.variant(entry, encoding)
+            if not self.send_file_headers(entry.content_type, len(body), entry.mtime, entry.variant_etag(encoding),
+                                          encoding, entry.compressible, byte_range):
+                return None
+            if byte_range:
+                start, end = byte_range
+                return io.BytesIO(memoryview(body)[start:end + 1])
+            return io.BytesIO(body)
+        
+        # Too big for the cache: served straight from disk, with sendfile() in copyfile()
+        try:
+            f = open(path, 'rb')
+            stat = os.fstat(f.fileno())
+            etag = file_etag(path, stat)
+        except OSError:
+            self.send_error(HTTPStatus.NOT_FOUND, "File not found")
+            return None
+        byte_range = self.requested_range(etag, stat.st_size)
+        if not self.send_file_headers(self.guess_type(path), stat.st_size, stat.st_mtime, etag, byte_range=byte_range):
+            f.close()
+            return None
+        start, end = byte_range or (0, stat.st_size - 1)
+        return FileRange(f, start, end - start + 1)
+    
+    def copyfile(self, source, outputfile):
+        if not isinstance(source, FileRange):
+            return super().copyfile(source, outputfile)
+        if source.length >= SENDFILE_MIN_SIZE:
+            # The kernel copies file -> socket; socket.sendfile() falls back to send() where it must
+            self.connection.sendfile(source.file, source.offset, source.length)
+            return
+        source.file.seek(source.offset)
+        outputfile.write(source.file.read(source.length))
 
     def do_GET(self):
-        # Simulate GitHub Pages behavior: serve 404.html for missing files
-        # This allows client-side routing to work
+        if self.games_index and urllib.parse.urlsplit(self.path).path == GAMES_API_PATH:
+            return self.send_games_index()
+        
+        # Serve the file normally; missing files get 404.html like GitHub Pages (see send_error)
+        return super().do_GET()
+    
+    def do_HEAD(self):
+        if self.games_index and urllib.parse.urlsplit(self.path).path == GAMES_API_PATH:
+            return self.send_games_index()
+        return super().do_HEAD()
+    
+    def send_games_index(self):
+        """The whole catalogue as an array, or with query parameters a filtered, sorted page of it.
         
-        # First, try to serve the file normally
-        original_path = self.path
-        result = super().do_GET()
+        ?category=retro&category=singleplayer  games in every listed category (comma lists work too)
+        ?state=released                         games in any listed state
+        ?q=bird                                 games with a word starting with each search word
+        ?sort=-release_date&page=2&per_page=20  sort by name, id, release_date, developer or state
+        """
+        index = self.games_index.refresh()
+        query = urllib.parse.parse_qs(urllib.parse.urlsplit(self.path).query)
+        if not any(name in query for name in GAMES_QUERY_PARAMS):
+            query = None
+        if query:
+            body = self.query_games_index(index, query)
+            if body is None:
+                return
+            etag = f'"{hashlib.sha1(index.etag.encode() + body).hexdigest()}"'
+        else:
+            body, etag = index.body, index.etag
         
-        return result
+        offered = [e for e in ENCODING_SUFFIXES if can_compress(e)] if len(body) >= COMPRESS_MIN_SIZE else []
+        encoding = negotiate_encoding(self.headers.get('Accept-Encoding', ''), offered)
+        if encoding is not None:
+            body = index.variant(encoding) if not query else compress(body, encoding)
+            etag = f'{etag[:-1]}-{encoding}"'
+        if self.send_file_headers('application/json', len(body), index.mtime, etag, encoding, vary=True, static=False):
+            if self.command != 'HEAD':
+                self.wfile.write(body)
+    
+    def query_games_index(self, index, query):
+        """JSON body for a filtered /api/games request, or None after sending a 400"""
+        def values(name):
+            return [v.strip() for value in query.get(name, []) for v in value.split(',') if v.strip()]
+        
+        sort = query.get('sort', ['name'])[-1]
+        descending = sort.startswith('-')
+        sort = sort.lstrip('-')
+        try:
+            page = int(query.get('page', ['1'])[-1])
+            per_page = int(query.get('per_page', [str(GAMES_PER_PAGE)])[-1])
+        except ValueError:
+            page = per_page = 0
+        if sort not in GAME_SORT_KEYS or page < 1 or not 1 <= per_page <= GAMES_MAX_PER_PAGE:
+            self.send_json_error(HTTPStatus.BAD_REQUEST,
+                                 f"sort must be one of {', '.join(GAME_SORT_KEYS)}; "
+                                 f"page >= 1; per_page 1-{GAMES_MAX_PER_PAGE}")
+            return None
+        
+        result = index.query(values('category'), values('state'), ' '.join(query.get('q', [])),
+                             sort, descending, page, per_page)
+        return json.dumps(result).encode('utf-8')
+    
+    def send_json_error(self, code, message):
+        """An API error: the standard reason phrase, with the detail in a JSON body"""
+        body = json.dumps({'error': message}).encode('utf-8')
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
     
     def send_error(self, code, message=None):
         # When a 404 occurs, serve the 404.html file instead (like GitHub Pages does)
         if code == 404:
             try:
                 # Try to read and serve 404.html
-                error_file = DIRECTORY / '404.html'
-                if error_file.exists():
-                    with open(error_file, 'rb') as f:
-                        content = f.read()
-                    
+                content = self.error_page()
+                if content is not None:
                     self.send_response(404)
                     self.send_header('Content-Type', 'text/html; charset=utf-8')
                     self.send_header('Content-Length', str(len(content)))
                     self.end_headers()
-                    self.wfile.write(content)
+                    if self.command != 'HEAD':
+                        self.wfile.write(content)
                     return
             except Exception as e:
                 print(f"Error serving 404.html: {e}")
         
         # Fallback to default error handling
         super().send_error(code, message)
+    
+    def error_page(self):
+        """Bytes of 404.html, or None if the site has none"""
+        error_file = str(DIRECTORY / '404.html')
+        if self.file_cache:
+            entry = self.file_cache.lookup(error_file) or self.file_cache.load(error_file, error_file, 'text/html')
+            if entry is not None:
+                # data is None when the site has no 404.html
+                return entry.data
+        if not os.path.isfile(error_file):
+            return None
+        with open(error_file, 'rb') as f:
+            return f.read()
+
+
+class LegacyHTTPRequestHandler(MyHTTPRequestHandler):
+    """The original behaviour: HTTP/1.0, one connection per request, plain file serving"""
+    protocol_version = 'HTTP/1.0'
+    timeout = None
+    disable_nagle_algorithm = False
+    file_cache = None
+    games_index = None
+    send_head = http.server.SimpleHTTPRequestHandler.send_head
+
+
+class PooledHTTPServer(socketserver.TCPServer):
+    """TCPServer that hands each connection to a bounded pool of worker threads"""
+    
+    allow_reuse_address = True
+    request_queue_size = 128
+    
+    def __init__(self, server_address, handler_class, workers=WORKERS):
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='http')
+        super().__init__(server_address, handler_class)
+    
+    def process_request(self, request, client_address):
+        self.pool.submit(self.process_request_thread, request, client_address)
+    
+    def process_request_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+    
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Serve the site locally like GitHub Pages')
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--workers', type=int, default=WORKERS,
+                        help=f'threads serving connections (default {WORKERS})')
+    parser.add_argument('--legacy', action='store_true',
+                        help='single-threaded HTTP/1.0 server, as before')
+    parser.add_argument('--prod', action='store_true',
+                        help='send ETags, answer 304s and let browsers cache (default: no-store for development)')
+    parser.add_argument('--cache-mb', type=float, default=CACHE_BUDGET / 2**20,
+                        help=f'memory budget of the in-memory file cache, 0 to disable (default {CACHE_BUDGET // 2**20})')
+    parser.add_argument('--no-browser', action='store_true', help="don't open a browser tab")
+    return parser.parse_args()
+
+
+def make_server(port, workers=WORKERS, legacy=False):
+    if legacy:
+        return socketserver.TCPServer(("", port), LegacyHTTPRequestHandler)
+    return PooledHTTPServer(("", port), MyHTTPRequestHandler, workers=max(1, workers))
 
 
 def main():
     """Start the web server and open the browser"""
+    args = parse_args()
+    MyHTTPRequestHandler.production = args.prod
+    if args.cache_mb > 0:
+        # Development re-checks mtimes on every hit so edits show up straight away
+        MyHTTPRequestHandler.file_cache = FileCache(int(args.cache_mb * 2**20),
+                                                    check_interval=1.0 if args.prod else 0.0)
+    MyHTTPRequestHandler.games_index = GamesIndex(check_interval=1.0 if args.prod else 0.0)
     
     # Change to the project root directory
     os.chdir(DIRECTORY)
     
     # Create the server
-    with socketserver.TCPServer(("", PORT), MyHTTPRequestHandler) as httpd:
+    with make_server(args.port, args.workers, args.legacy) as httpd:
+        mode = 'single-threaded, HTTP/1.0' if args.legacy else f'{max(1, args.workers)} workers, HTTP/1.1 keep-alive'
         print(f"🚀 Server started successfully! (Simulating GitHub Pages)")
         print(f"📂 Serving files from: {DIRECTORY}")
-        print(f"🌐 Open your browser at: http://localhost:{PORT}/")
+        print(f"🧵 Mode: {mode}")
+        print(f"🗄️  Caching: {'production (ETag + 304)' if args.prod else 'disabled (development)'}")
+        print(f"💾 File cache: {f'{args.cache_mb:g} MB' if args.cache_mb > 0 else 'off'}")
+        if args.cache_mb > 0:
+            print(f"🗜️  Compression: {', '.join(e for e in ENCODING_SUFFIXES if can_compress(e))} (+ precompressed siblings)")
+        print(f"🌐 Open your browser at: http://localhost:{args.port}/")
         print(f"⏹️  Press Ctrl+C to stop the server")
         print(f"\n💡 Note: This simulates GitHub Pages static hosting.")
-        print(f"   - No /api/games endpoint (games load from data.json files)")
+        if args.legacy:
+            print(f"   - No {GAMES_API_PATH} endpoint (games load from data.json files)")
+        else:
+            print(f"   - {GAMES_API_PATH} serves the game index (on GitHub Pages: game-launcher/games.json)")
         print(f"   - 404.html handles client-side routing\n")
         
         # Open the browser automatically to the site's home
-        webbrowser.open(f'http://localhost:{PORT}/')
+        if not args.no_browser:
+            webbrowser.open(f'http://localhost:{args.port}/')
         
         try:
             # Start serving